@@ -1,21 +1,33 @@
 # assistant/assistant.py
 
-from openai import OpenAI
-from core.config_loader import load_env_variables, load_config
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from core.config_loader import load_env_variables, load_config, get_config_version
 from utils.usage_guard import can_call_model, record_usage
-from utils.persistence import persist_appointment, persist_call_session, persist_usage
-from utils.structured_logger import log_event
-from assistant.session import CallSession
-from assistant.slot_extractor import extract_and_prepare
+from utils.persistence import batched_writes, persist_call_session, persist_usage
+from utils.structured_logger import Lazy, log_event
+from assistant.session import CallSession, SLOT_BITS
+from assistant.slot_extractor import extract_and_prepare, normalize_text
 from assistant.escalation import escalation_message, mark_and_log
-from calendar_integration.ics_writer import (
-    has_conflict,
-    suggest_next_slot,
-    add_event_to_calendar,
-    FatalBookingError,
-)
-from datetime import datetime, time as dtime
+from assistant.semcache import ConfirmationCache
+from assistant.batch_llm import ChatBatch
+from assistant.ratelimit import AsyncLimiter
+from assistant.llm_batcher import LLMBatcher
+from assistant._fastvalidate import USE_NUMBA, days_in_month, validate_date_bytes, validate_time_bytes
+from datetime import datetime
+from functools import lru_cache
+import re
 from typing import Optional
+from zoneinfo import ZoneInfo
 
 # ==== LLM confirmation helper & exceptions ====
 
@@ -23,166 +35,689 @@ class UsageLimitError(Exception):
     """Raised when can_call_model() returns False."""
     pass
 
-def llm_confirm(paraphrase: str, session: 'CallSession') -> bool | None:
+# Requests-per-minute budget for the model; caps how many calls are in flight at once
+LLM_QPM = int(os.getenv("LLM_QPM", "500"))
+LLM_CONCURRENCY = max(1, LLM_QPM // 60)
+# One Semaphore per event loop: a contended Semaphore binds to the loop it
+# first waits on, and the sync wrappers each start their own via asyncio.run
+_llm_slots_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_llm_slots_lock = threading.Lock()
+
+def _llm_slots() -> asyncio.Semaphore:
+    """
+    The in-flight cap for the running loop.
+    """
+    loop = asyncio.get_running_loop()
+    slots = _llm_slots_by_loop.get(loop)
+    if slots is None:
+        with _llm_slots_lock:
+            slots = _llm_slots_by_loop.setdefault(loop, asyncio.Semaphore(LLM_CONCURRENCY))
+    return slots
+# Requests-per-minute bucket shared by all concurrent sessions (429 retries are left to the SDK)
+_llm_rate = AsyncLimiter(max_rate=LLM_QPM, time_period=60)
+
+# Yes/no confirmations don't need the receptionist persona, just a one-line instruction
+CONFIRM_SYSTEM_PROMPT = (
+    "Did the caller agree to the booking question? "
+    "Reply with exactly one token: YES, NO, or UNCLEAR."
+)
+CONFIRM_MAX_TOKENS = 2
+# Deadline for a whole confirmation call, SDK retries included; past it the
+# turn escalates instead of leaving the caller waiting on a stalled stream
+CONFIRM_TIMEOUT = float(os.getenv("LLM_CONFIRM_TIMEOUT", "4"))
+_FIRST_WORD_RE = re.compile(r"[a-z]+")
+# First word followed by a non-letter: the verdict can't change after this
+_FIRST_WORD_DONE_RE = re.compile(r"[a-z]+[^a-z]", re.I)
+
+def build_confirm_prompt(paraphrase: str) -> list[dict]:
+    """
+    Minimal messages for a yes/no confirmation (~30 tokens instead of the full system prompt).
+    """
+    return [
+        {"role": "system", "content": CONFIRM_SYSTEM_PROMPT},
+        {"role": "user", "content": paraphrase.strip()},
+    ]
+
+LLM_MODEL = "gpt-3.5-turbo"
+
+# LLM verdicts keyed on (model, normalized question), so a repeated paraphrase/reply
+# (a retry after a typo fix, the same slot asked across calls) skips the API.
+# Entries expire after LLM_CACHE_TTL seconds.
+CONFIRM_MEMO_SIZE = 10_000
+CONFIRM_MEMO_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+_confirm_memo: OrderedDict[tuple, tuple[float, bool | None]] = OrderedDict()
+
+def _memo_key(question: str) -> tuple:
+    # lowercased, punctuation stripped, whitespace collapsed
+    return LLM_MODEL, normalize_text(question)
+
+def clear_confirm_memo():
+    _confirm_memo.clear()
+
+async def llm_confirm_async(paraphrase: str, session: 'CallSession', reply: Optional[str] = None) -> bool | None:
     """
     Ask the LLM a yes/no question (paraphrase).
+    If the caller's reply is given, it is included in the question; when the
+    keyword matchers or the confirmation cache already resolve it no API call
+    is made, and an LLM verdict on it is stored in the cache.
     Returns True for yes, False for no, or None if unclear.
-    Raises UsageLimitError if calling the model is disallowed.
+    Raises UsageLimitError if calling the model is disallowed, and
+    TimeoutError if no verdict arrives within CONFIRM_TIMEOUT seconds.
     """
+    call_id = session.call_id
+    if reply is not None:
+        verdict = classify_reply(reply)
+        if verdict is not None:
+            return verdict
+        if (cached := confirm_cache.lookup(reply)) is not None:
+            session.add_history("confirm_cache_hit", input_data=reply, output_data=cached)
+            log_event(call_id, "confirm_cache_hit", input_data=reply, output_data=cached)
+            return cached == "yes"
+
+    question = paraphrase if reply is None else f'{paraphrase}\nCaller replied: "{reply}"'
+    key = _memo_key(question)
+    hit = _confirm_memo.get(key)
+    if hit is not None and hit[0] <= time.monotonic():
+        del _confirm_memo[key]
+        hit = None
+    if hit is not None:
+        _confirm_memo.move_to_end(key)
+        verdict = hit[1]
+        log_event(call_id, "llm_confirm_memo_hit", input_data=question, output_data=verdict)
+        return verdict
+
     # Check quota
     if not can_call_model():
         raise UsageLimitError()
 
-    # Build the LLM prompt
-    messages = build_llm_prompt(paraphrase, session, missing_slots=[])
-    # Call GPT deterministically
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=messages,
-        temperature=0.0,
-        max_tokens=32,
+    # A timed-out call still finishes in the batcher; its tokens are
+    # recorded from there, off the event loop
+    def orphaned(result):
+        asyncio.get_running_loop().run_in_executor(None, _record_confirm_usage, call_id, result[1])
+
+    text, total = await asyncio.wait_for(
+        _confirm_batcher.submit(build_confirm_prompt(question), orphaned=orphaned),
+        CONFIRM_TIMEOUT,
     )
+    _record_confirm_usage(call_id, total)
 
-    # Record token usage
-    usage = getattr(response, "usage", {}) or {}
-    total = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+    text = text.strip().lower()
+    log_event(call_id, "llm_confirm_reply", input_data=question, output_data=text)
+    session.add_history("llm_confirm_reply", input_data=question, output_data=text)
+
+    verdict = _verdict_from_text(text)
+    _confirm_memo[key] = (time.monotonic() + CONFIRM_MEMO_TTL, verdict)
+    if len(_confirm_memo) > CONFIRM_MEMO_SIZE:
+        _confirm_memo.popitem(last=False)
+    if reply is not None and verdict is not None:
+        confirm_cache.store(reply, "yes" if verdict else "no")
+    return verdict
+
+def _record_confirm_usage(call_id: str, total: int):
     if total:
         record_usage(total)
         try:
-            persist_usage(session.call_id, total)
+            persist_usage(call_id, total)
         except Exception:
             # best effort
             pass
 
-    # Extract and normalize output
-    text = response.choices[0].message.content.strip().lower()
-    log_event(session.call_id, "llm_confirm_reply", input_data=paraphrase, output_data=text)
-    session.add_history("llm_confirm_reply", input_data=paraphrase, output_data=text)
+def _verdict_from_text(text: str) -> bool | None:
+    # The reply should be a single label: YES -> True, NO -> False, anything else -> None.
+    # Callers pass the reply already lowercased (they log it that way too)
+    m = _FIRST_WORD_RE.search(text)
+    return _LABELS.get(m.group()) if m else None
 
-    # Map to boolean or None
-    if any(kw in text for kw in AFFIRMATIVE_KEYWORDS):
-        return True
-    if any(kw in text for kw in NEGATIVE_KEYWORDS):
-        return False
-    return None
+def llm_confirm(paraphrase: str, session: 'CallSession', reply: Optional[str] = None) -> bool | None:
+    """
+    Blocking wrapper around llm_confirm_async for callers without an event loop.
+    """
+    return asyncio.run(llm_confirm_async(paraphrase, session, reply))
+
+def llm_confirm_batch(
+    paraphrases: list[str],
+    sessions: list['CallSession'],
+    poll_interval: float = 30.0,
+    timeout: Optional[float] = None,
+) -> list[bool | None]:
+    """
+    Deferred llm_confirm for many sessions as one OpenAI Batch API job
+    (half-price tokens, results within the 24h window). Blocks until the
+    batch finishes; requests that failed inside the batch come back as None.
+    Raises UsageLimitError if calling the model is disallowed.
+    """
+    if not can_call_model():
+        raise UsageLimitError()
+    batch = ChatBatch(_get_client(), max_tokens=CONFIRM_MAX_TOKENS)
+    ids = []
+    for i, (paraphrase, session) in enumerate(zip(paraphrases, sessions)):
+        custom_id = f"{session.call_id}:{i}"
+        ids.append(custom_id)
+        batch.add(custom_id, build_confirm_prompt(paraphrase))
+    if not ids:
+        return []
+    results = batch.wait(batch.submit(), poll_interval=poll_interval, timeout=timeout)
+
+    verdicts = []
+    for custom_id, paraphrase, session in zip(ids, paraphrases, sessions):
+        res = results.get(custom_id)
+        if res is None:
+            verdicts.append(None)
+            continue
+        total = _usage_total(res["usage"])
+        if total:
+            record_usage(total)
+            try:
+                persist_usage(session.call_id, total)
+            except Exception:
+                # best effort
+                pass
+        text = res["text"].strip().lower()
+        log_event(session.call_id, "llm_confirm_batch_reply", input_data=paraphrase, output_data=text)
+        session.add_history("llm_confirm_batch_reply", input_data=paraphrase, output_data=text)
+        verdicts.append(_verdict_from_text(text))
+    return verdicts
+
+# Paraphrases classified per request by llm_confirm_many
+CONFIRM_MANY_BATCH = 10
+_LABELS = {"yes": True, "no": False}
+_NUMBERED_LABEL_RE = re.compile(r"^\W*(\d+)\W+(yes|no|unclear)\b", re.I | re.M)
+
+def _parse_labels(text: str, n: int) -> list[bool | None]:
+    """
+    Read n YES/NO/UNCLEAR labels from a reply that should be a JSON list;
+    falls back to "1. YES"-style lines when it is not.
+    """
+    start, end = text.find("["), text.rfind("]")
+    try:
+        items = json.loads(text[start:end + 1]) if -1 < start < end else None
+    except ValueError:
+        items = None
+    if isinstance(items, list):
+        labels = [_LABELS.get(str(x).strip().lower()) for x in items[:n]]
+    else:
+        labels = [None] * n
+        for m in _NUMBERED_LABEL_RE.finditer(text):
+            i = int(m.group(1)) - 1
+            if 0 <= i < n:
+                labels[i] = _LABELS.get(m.group(2).lower())
+    return labels + [None] * (n - len(labels))
+
+async def llm_confirm_many_async(paraphrases: list[str], session: 'CallSession') -> list[bool | None]:
+    """
+    Classify several paraphrases with one completion per CONFIRM_MANY_BATCH
+    items, so the system prompt is sent once per group instead of per item.
+    Returns True / False / None (unclear) per paraphrase, in order.
+    Raises UsageLimitError if calling the model is disallowed.
+    """
+    verdicts: list[bool | None] = []
+    for i in range(0, len(paraphrases), CONFIRM_MANY_BATCH):
+        group = paraphrases[i:i + CONFIRM_MANY_BATCH]
+        if not can_call_model():
+            raise UsageLimitError()
+        listing = "\n".join(f"{n}. {p.strip()}" for n, p in enumerate(group, 1))
+        messages = [
+            {"role": "system", "content": (
+                "Classify each line as YES, NO or UNCLEAR. Reply only with a JSON list "
+                f"of {len(group)} strings, in order."
+            )},
+            {"role": "user", "content": listing},
+        ]
+        async with _llm_rate, _llm_slots():
+            response = await _get_aclient().chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                temperature=0.0,
+                max_tokens=8 * len(group) + 8,
+            )
+        total = _usage_total(getattr(response, "usage", None))
+        if total:
+            record_usage(total)
+            try:
+                persist_usage(session.call_id, total)
+            except Exception:
+                # best effort
+                pass
+        text = (response.choices[0].message.content or "").strip()
+        log_event(session.call_id, "llm_confirm_many_reply", input_data=group, output_data=text)
+        session.add_history("llm_confirm_many_reply", input_data=group, output_data=text)
+        verdicts.extend(_parse_labels(text, len(group)))
+    return verdicts
+
+def llm_confirm_many(paraphrases: list[str], session: 'CallSession') -> list[bool | None]:
+    """
+    Blocking wrapper around llm_confirm_many_async.
+    """
+    return asyncio.run(llm_confirm_many_async(paraphrases, session))
 
 
 # Load configuration and OpenAI client
 env = load_env_variables()
-client = OpenAI(api_key=env["OPENAI_API_KEY"])
+
+# One pooled keep-alive transport per client so repeat calls skip the TLS handshake.
+# HTTP/2 needs the optional `h2` package (httpx[http2]); fall back to HTTP/1.1 without it.
+_HTTP2 = importlib.util.find_spec("h2") is not None
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+# Fail fast on a dead connection; the SDK retries with exponential backoff
+_HTTP_TIMEOUT = httpx.Timeout(15.0, connect=3.0)
+_MAX_RETRIES = 3
+
+# Each client costs ~100 ms (TLS context) to build, so both are created on
+# first use and then shared; `client` / `aclient` stay readable (and
+# patchable) as module attributes through __getattr__ below. The lock keeps
+# a prewarm thread and a caller from building two.
+_client_lock = threading.Lock()
+
+def _get_client() -> OpenAI:
+    c = globals().get("client")
+    if c is None:
+        with _client_lock:
+            c = globals().get("client")
+            if c is None:
+                c = globals()["client"] = OpenAI(
+                    api_key=env["OPENAI_API_KEY"],
+                    max_retries=_MAX_RETRIES,
+                    http_client=httpx.Client(http2=_HTTP2, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT),
+                )
+    return c
+
+def _get_aclient() -> AsyncOpenAI:
+    c = globals().get("aclient")
+    if c is None:
+        with _client_lock:
+            c = globals().get("aclient")
+            if c is None:
+                c = globals()["aclient"] = AsyncOpenAI(
+                    api_key=env["OPENAI_API_KEY"],
+                    max_retries=_MAX_RETRIES,
+                    http_client=httpx.AsyncClient(http2=_HTTP2, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT),
+                )
+    return c
+
+def _prewarm_aclient():
+    """
+    Build the async client in a worker thread while the caller reads the
+    confirmation question, so an LLM fallback on their reply doesn't also
+    pay for client setup. No-op once the client exists.
+    """
+    if globals().get("aclient") is None:
+        task = asyncio.create_task(asyncio.to_thread(_get_aclient))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+async def aclose_clients():
+    """
+    Close the shared OpenAI clients and their pooled connections; await it
+    before the event loop shuts down. The next call builds fresh clients.
+    """
+    c = globals().pop("client", None)
+    if c is not None:
+        c.close()
+    c = globals().pop("aclient", None)
+    if c is not None:
+        await c.close()
+
 config = load_config()
 
-# === System prompt ===
-SYSTEM_PROMPT = """
-You are a professional, strict, and cost-conscious AI receptionist for a mechanic shop.
-Your domain is only:
-  - Booking appointments (service, date, time)
-  - Clarifying booking details
-  - Providing information on services, prices, availability/hours
-  - Confirming bookings
-Do NOT answer anything outside those topics. If asked off-topic, reply: "I'm only trained to assist with mechanic shop-related questions."
-Rules:
-  1. Always extract or confirm the required booking slots: service, date (YYYY-MM-DD), time (HH:MM in 24h).
-  2. If any slot is missing or ambiguous, ask one concise clarification question at a time.
-  3. Echo back service, date, and time exactly when confirming: "Just to confirm: you want a <service> on <date> at <time>. Is that correct?"
-  4. If requested slot conflicts, offer the next available slot and ask: "That slot is taken. The next available is <date> at <time>. Do you want that instead?"
-  5. After two failed attempts per slot or rejection of valid alternative, escalate with: 
-     "I'm having trouble completing that booking. I can transfer you to a human staff member for help."
-  6. Be concise. Do not invent availability or services.
-"""
+
+def _booking_constants(cfg) -> tuple:
+    """
+    Per-config values every booking needs: (ics_path, business_start, business_end).
+    """
+    return (
+        cfg.calendar.ics_path,
+        cfg.hours.open_time,
+        cfg.hours.close_time,
+    )
+
+_ICS_PATH, _BIZ_START, _BIZ_END = _booking_constants(config)
+
+def _service_tables(cfg) -> tuple:
+    """
+    Per-config service lookups:
+    (comma-joined names, lowercased name -> duration, service clarify prompt).
+    """
+    names = ", ".join(s.name for s in cfg.services)
+    durations = {}
+    for s in cfg.services:
+        durations.setdefault(s.name.lower(), s.duration_minutes)
+    return names, durations, f"Which service would you like to book? Options: {names}: "
+
+_SERVICE_NAMES_JOINED, _DURATION_BY_NAME, _SERVICE_PROMPT = _service_tables(config)
+
+
+def reload_config():
+    """
+    Re-read the JSON config. The config version bump evicts every cached
+    reply derived from the previous config.
+    """
+    global config, _ICS_PATH, _BIZ_START, _BIZ_END
+    global _SERVICE_NAMES_JOINED, _DURATION_BY_NAME, _SERVICE_PROMPT
+    config = load_config(force=True)
+    _ICS_PATH, _BIZ_START, _BIZ_END = _booking_constants(config)
+    _SERVICE_NAMES_JOINED, _DURATION_BY_NAME, _SERVICE_PROMPT = _service_tables(config)
+    return config
+
+# Intent keywords, in priority order (first matching intent wins)
+INTENT_KEYWORDS = {
+    "booking": ("book", "appointment", "schedule", "reserve"),
+    "pricing": ("price", "cost", "how much", "rate", "charge"),
+    "information": ("what", "when", "hours", "open", "close", "availability"),
+}
+HOURS_KEYWORDS = ("hours", "open", "close")
+
+def _keyword_alternation(words) -> str:
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+# One anchored match: each branch looks ahead through the whole input for its
+# keywords and branches are tried in priority order (booking > pricing > information),
+# so lastgroup is the winning intent. re.I spares lowercasing the input.
+_INTENT_RE = re.compile(
+    "|".join(
+        f"(?=.*?(?P<{intent}>{_keyword_alternation(words)}))" for intent, words in INTENT_KEYWORDS.items()
+    ),
+    re.I | re.S,
+)
+_HOURS_RE = re.compile(_keyword_alternation(HOURS_KEYWORDS))
+_PRICING_RE = re.compile(_keyword_alternation(INTENT_KEYWORDS["pricing"]))
 
 # Intent helper
+@lru_cache(maxsize=1024)
+def _classify_intent_cached(text: str, cfg_version: int) -> str:
+    m = _INTENT_RE.match(text)
+    return m.lastgroup if m else "general"
+
 def classify_intent(user_input: str) -> str:
-    lowered = user_input.lower()
-    if any(k in lowered for k in ["book", "appointment", "schedule", "reserve"]):
-        return "booking"
-    if any(k in lowered for k in ["price", "cost", "how much", "rate", "charge"]):
-        return "pricing"
-    if any(k in lowered for k in ["what", "when", "hours", "open", "close", "availability"]):
-        return "information"
-    return "general"
+    # silence / empty ASR result: nothing to scan (or to cache)
+    if not user_input or user_input.isspace():
+        return "general"
+    return _classify_intent_cached(user_input, get_config_version())
 
 # Confirmation keywords
 AFFIRMATIVE_KEYWORDS = {
     "yes", "yep", "correct", "that is right", "sure", "sounds good", "affirmative",
-    "yup", "right", "yeah", "please do", "go ahead", "works", "okay", "ok"
+    "yup", "right", "yeah", "please do", "go ahead", "works", "okay", "ok",
+    # common variants, so more replies resolve without an LLM hop
+    "yea", "ya", "yes please", "absolutely", "definitely", "certainly", "of course",
+    "perfect", "alright", "all right", "confirm", "confirmed", "exactly", "uh huh", "mhm",
+    "do it", "proceed", "go for it", "book it",
 }
 NEGATIVE_KEYWORDS = {
     "no", "nah", "incorrect", "don't", "do not", "nope", "not really", "wrong",
-    "actually", "change", "cancel"
+    "actually", "change", "cancel",
+    "negative", "not right", "not correct", "never mind", "nevermind", "dont",
 }
 
-# Build LLM prompt
-def build_llm_prompt(user_input: str, session: CallSession, missing_slots: list[str]) -> list[dict]:
-    messages = [{"role": "system", "content": SYSTEM_PROMPT.strip()}]
-    if missing_slots:
-        messages.append({
-            "role": "system",
-            "content": f"User still needs to provide: {', '.join(missing_slots)}."
-        })
-    else:
-        confirmed = ", ".join(f"{k}={v}" for k, v in session.state.items() if k in ["service", "date", "time"])
-        messages.append({
-            "role": "system",
-            "content": f"Confirmed booking info: {confirmed}."
-        })
-    messages.append({"role": "user", "content": user_input.strip()})
-    return messages
+def _word_re(words) -> re.Pattern:
+    return re.compile(r"\b(?:" + _keyword_alternation(words) + r")\b", re.I)
+
+_AFFIRM_RE = _word_re(AFFIRMATIVE_KEYWORDS)
+_DENY_RE = _word_re(NEGATIVE_KEYWORDS)
+
+def classify_reply(text: str) -> bool | None:
+    """
+    True for a clear yes, False when any denial is present, None if neither.
+    """
+    if _DENY_RE.search(text):
+        return False
+    if _AFFIRM_RE.search(text):
+        return True
+    return None
+
+# Fixed replies and slot names, built once
+_FALLBACK_REPLY = "I'm only trained to assist with mechanic shop-related questions."
+_OKAY_TRY_AGAIN = "Okay, let's try again."
+_ESCALATION = escalation_message()
+_USAGE_LIMIT_REPLY = "Usage limit reached. " + _ESCALATION
+_CONFIRM_ERROR_REPLY = "Error during confirmation. " + _ESCALATION
+_FINALIZE_ERROR_REPLY = "Failed to finalize booking due to system error. " + _ESCALATION
+_FINALIZE_FAILED_REPLY = "Failed to finalize booking. " + _ESCALATION
+_SLOT_CONFLICT_REPLY = "That slot is unavailable due to a conflict."
+_ALT_SLOT_PROMPT = "The next available slot is {}. Do you want that instead? (yes/no)".format
+_REPLY_PROMPT = "> "
+_BIT_TO_SLOT = {bit: slot for slot, bit in SLOT_BITS.items()}
+_PARAPHRASE = "Just to confirm: you want a {} on {} at {}. Is that correct?".format
+
+# Replies already resolved to yes/no skip the LLM confirmation call
+confirm_cache = ConfirmationCache(AFFIRMATIVE_KEYWORDS, NEGATIVE_KEYWORDS)
 
 # Validators
+_LOCAL_TZ = ZoneInfo("America/Toronto")
+# ASCII digits only; used with fullmatch so a trailing newline is rejected too
+_DATE_RE = re.compile(r"([0-9]{4})-(0[1-9]|1[0-2])-([0-9]{2})")
+_TIME_RE = re.compile(r"(?:[01][0-9]|2[0-3]):[0-5][0-9]")
+
 def validate_date_format(date_str: str) -> bool:
-    try:
-        datetime.strptime(date_str, "%Y-%m-%d")
-        return True
-    except ValueError:
+    """
+    Strict YYYY-MM-DD check (real calendar date) without strptime.
+    """
+    if not date_str:
+        return False
+    if USE_NUMBA:
+        return validate_date_bytes(date_str.encode("utf-8"))
+    match = _DATE_RE.fullmatch(date_str)
+    if match is None:
         return False
+    y, m, d = int(match[1]), int(match[2]), int(match[3])
+    return y >= 1 and 1 <= d <= days_in_month(y, m)
 
 def validate_time_format(time_str: str) -> bool:
-    parts = time_str.split(":")
-    if len(parts) != 2:
-        return False
-    h, m = parts
-    try:
-        return 0 <= int(h) <= 23 and 0 <= int(m) <= 59
-    except ValueError:
+    """
+    Strict HH:MM (24h) check.
+    """
+    if not time_str:
         return False
+    if USE_NUMBA:
+        return validate_time_bytes(time_str.encode("utf-8"))
+    return _TIME_RE.fullmatch(time_str) is not None
 
 def parse_local_datetime(date_str: str, time_str: str) -> datetime:
-    from zoneinfo import ZoneInfo
-    LOCAL_TZ = ZoneInfo("America/Toronto")
-    dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
-    return dt.replace(tzinfo=LOCAL_TZ)
+    """
+    Build an aware datetime from validated YYYY-MM-DD / HH:MM slots.
+    Raises ValueError on malformed input, like strptime would.
+    """
+    return datetime(
+        int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10]),
+        int(time_str[:2]), int(time_str[3:5]), tzinfo=_LOCAL_TZ,
+    )
 
 # Info handler
-def handle_info_intent(user_input: str, session: CallSession) -> str:
-    call_id = session.call_id
-    lowered = user_input.lower()
-    if "hours" in lowered or "open" in lowered or "close" in lowered:
-        reply = f"We are open from {config.hours.open} to {config.hours.close}."
-        log_event(call_id, "info_response", output_data=reply)
-        session.add_history("info_response", output_data=reply)
-        return reply
-    if any(kw in lowered for kw in ["price", "cost", "how much", "rate", "charge"]):
-        found = []
-        for s in config.services:
-            if s.name.lower() in lowered:
-                price = s.price or "N/A"
-                found.append(f"{s.name}: {price}")
+@lru_cache(maxsize=1024)
+def _info_reply(lowered: str, cfg_version: int) -> tuple[str, str]:
+    """
+    Pure reply builder for informational questions.
+    Returns (step_name, reply); logging stays with the caller.
+    """
+    answer = config.faq_answer(lowered)
+    if answer is not None:
+        return "faq_response", answer
+    if _HOURS_RE.search(lowered):
+        return "info_response", f"We are open from {config.hours.open} to {config.hours.close}."
+    if _PRICING_RE.search(lowered):
+        found = [f"{s.name}: {s.price or 'N/A'}" for s in config.services_mentioned(lowered)]
         if found:
             reply = "Pricing: " + "; ".join(found)
         else:
-            svc_names = ", ".join([s.name for s in config.services])
-            reply = f"Which service are you asking about? Options: {svc_names}"
-        log_event(call_id, "pricing_response", output_data=reply)
-        session.add_history("pricing_response", output_data=reply)
-        return reply
-    fallback = "I'm only trained to assist with mechanic shop-related questions."
-    log_event(call_id, "fallback_info", output_data=fallback)
-    session.add_history("fallback_info", output_data=fallback)
-    return fallback
+            reply = f"Which service are you asking about? Options: {_SERVICE_NAMES_JOINED}"
+        return "pricing_response", reply
+    return "fallback_info", _FALLBACK_REPLY
+
+def handle_info_intent(user_input: str, session: CallSession) -> str:
+    call_id = session.call_id
+    step, reply = _info_reply(user_input.lower(), get_config_version())
+    log_event(call_id, step, output_data=reply)
+    session.add_history(step, output_data=reply)
+    return reply
+
+def _usage_total(usage) -> int:
+    """
+    Prompt + completion tokens from an OpenAI usage object (or a plain dict).
+    """
+    if not usage:
+        return 0
+    if isinstance(usage, dict):
+        return usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+    return (getattr(usage, "prompt_tokens", 0) or 0) + (getattr(usage, "completion_tokens", 0) or 0)
+
+async def stream_confirmation(messages: list[dict], max_tokens: int = CONFIRM_MAX_TOKENS) -> tuple[str, int]:
+    """
+    Stream a yes/no confirmation and stop reading as soon as the first word of
+    the reply is complete, since that word alone decides the verdict
+    (YES / NO / UNCLEAR). Returns (text, tokens_used).
+    An early close skips the final usage chunk, so tokens are then estimated
+    (~4 characters per token) to keep the usage guard honest.
+    """
+    buf = ""
+    total = 0
+    async with _llm_rate, _llm_slots():
+        stream = await _get_aclient().chat.completions.create(
+            model=LLM_MODEL, messages=messages,
+            temperature=0.0, max_tokens=max_tokens,
+            stream=True, stream_options={"include_usage": True},
+        )
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    total = _usage_total(chunk.usage)
+                if chunk.choices:
+                    buf += chunk.choices[0].delta.content or ""
+                    if _FIRST_WORD_DONE_RE.search(buf):
+                        break
+        finally:
+            await stream.close()
+    if not total:
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        total = (prompt_chars + len(buf)) // 4 + 1
+    return buf, total
+
+# Confirmation calls from concurrent sessions go out together: up to
+# LLM_BATCH_MAX requests collected for at most LLM_BATCH_WAIT_MS
+_confirm_batcher = LLMBatcher(
+    stream_confirmation,
+    max_batch=int(os.getenv("LLM_BATCH_MAX", "16")),
+    max_wait=int(os.getenv("LLM_BATCH_WAIT_MS", "50")) / 1000,
+)
+
+def _check_slot(dt: datetime, dur: int):
+    """
+    Conflict check that also hands back the parsed calendar, so a follow-up
+    suggest_next_slot() in the same request can reuse it.
+    """
+    from calendar_integration.ics_writer import has_conflict, load_sorted_events
+
+    events = load_sorted_events(_ICS_PATH)
+    return has_conflict(dt, dur, pre_sorted_events=events), events
+
+def _start_conflict_precheck(session: CallSession) -> tuple[Optional[datetime], Optional[asyncio.Task]]:
+    """
+    Parse the requested slot and start _check_slot() in a worker thread, so the
+    ICS read overlaps the confirmation turn (user reply and LLM call).
+    Returns (None, None) if the slot cannot be parsed; the booking step reports that.
+    """
+    try:
+        state = session.state
+        dt = parse_local_datetime(state["date"], state["time"])
+    except Exception:
+        return None, None
+    dur = _DURATION_BY_NAME.get(state["service"].lower(), 30)
+    task = asyncio.create_task(asyncio.to_thread(_check_slot, dt, dur))
+    # Retrieve the outcome even if the booking is abandoned, so errors are not reported as unhandled
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return dt, task
+
+async def _collect(io_adapter, prompt_text: str) -> str:
+    # Adapters block (console input, telephony bridges); keep them off the event
+    # loop so other sessions' model calls proceed meanwhile
+    return await asyncio.to_thread(io_adapter.collect, prompt_text)
+
+# Slot clarification: one handler per required slot, each asks once and
+# returns True if the slot was filled. A blank answer still uses up an
+# attempt but skips validation and logging.
+async def _clarify_service(session: CallSession, io_adapter, call_id: str) -> bool:
+    ans = await _collect(io_adapter, _SERVICE_PROMPT)
+    if not ans or ans.isspace():
+        return False
+    # interned: the same few service/date/time strings recur across sessions
+    session.update_slot("service", sys.intern(ans.strip().title()))
+    session.add_history("clarified_service", input_data=ans)
+    log_event(call_id, "clarified_service", input_data=ans)
+    return True
+
+def _clarify_validated(slot: str, question: str, invalid_msg: str, validate):
+    step_ok, step_invalid = f"clarified_{slot}", f"{slot}_invalid"
+
+    async def clarify(session: CallSession, io_adapter, call_id: str) -> bool:
+        ans = await _collect(io_adapter, question)
+        if not ans or ans.isspace():
+            return False
+        if validate(ans.strip()):
+            session.update_slot(slot, sys.intern(ans.strip()))
+            session.add_history(step_ok, input_data=ans)
+            log_event(call_id, step_ok, input_data=ans)
+            return True
+        io_adapter.prompt(invalid_msg)
+        session.add_history(step_invalid, input_data=ans)
+        log_event(call_id, step_invalid, input_data=ans)
+        return False
+    return clarify
+
+_SLOT_HANDLERS = {
+    "service": _clarify_service,
+    "date": _clarify_validated(
+        "date", "What date would you like? (YYYY-MM-DD): ",
+        "Invalid date format. Use YYYY-MM-DD.", validate_date_format,
+    ),
+    "time": _clarify_validated(
+        "time", "What time works for you? (HH:MM 24h): ",
+        "Invalid time format. Use HH:MM in 24h.", validate_time_format,
+    ),
+}
+
+# Calendar helpers are imported lazily (see _process_turn) and the OpenAI
+# clients are built on first use; keep all of them reachable as module attributes
+_CALENDAR_NAMES = frozenset({
+    "has_conflict", "load_sorted_events", "suggest_next_slot", "add_event_to_calendar", "FatalBookingError",
+    "SlotConflictError",
+})
+
+def __getattr__(name: str):
+    if name == "client":
+        return _get_client()
+    if name == "aclient":
+        return _get_aclient()
+    if name in _CALENDAR_NAMES:
+        from calendar_integration import ics_writer
+        return getattr(ics_writer, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Core entrypoint
 def process_interaction(user_input: str, session: CallSession, io_adapter, max_slot_attempts: int = 2) -> str:
+    """
+    Synchronous wrapper around process_interaction_async for callers without an
+    event loop. Must not be called from inside a running loop.
+    """
+    return asyncio.run(process_interaction_async(user_input, session, io_adapter, max_slot_attempts))
+
+async def process_interaction_async(user_input: str, session: CallSession, io_adapter, max_slot_attempts: int = 2) -> str:
+    """
+    Run one caller turn. Call and usage records written during the turn are
+    persisted together when it ends, including when it raises.
+    """
+    with batched_writes():
+        return await _process_turn(user_input, session, io_adapter, max_slot_attempts)
+
+async def process_interactions_async(turns: list[tuple], max_slot_attempts: int = 2) -> list:
+    """
+    Run turns from several call sessions concurrently on one loop, so their
+    LLM round trips and file I/O overlap. turns holds (user_input, session,
+    io_adapter) tuples; returns the replies in order, with an exception in
+    place of the reply for a turn that raised.
+    """
+    return await asyncio.gather(
+        *(process_interaction_async(u, s, io, max_slot_attempts) for u, s, io in turns),
+        return_exceptions=True,
+    )
+
+async def _process_turn(user_input: str, session: CallSession, io_adapter, max_slot_attempts: int) -> str:
     call_id = session.call_id
     log_event(call_id, "user_input", input_data=user_input)
     intent = classify_intent(user_input)
@@ -192,202 +727,177 @@ def process_interaction(user_input: str, session: CallSession, io_adapter, max_s
     if intent in ("pricing", "information"):
         return handle_info_intent(user_input, session)
     if intent != "booking":
-        fallback = "I'm only trained to assist with mechanic shop-related questions."
-        io_adapter.prompt(fallback)
-        log_event(call_id, "fallback", output_data=fallback)
-        session.add_history("fallback", output_data=fallback)
+        io_adapter.prompt(_FALLBACK_REPLY)
+        log_event(call_id, "fallback", output_data=_FALLBACK_REPLY)
+        session.add_history("fallback", output_data=_FALLBACK_REPLY)
         persist_call_session(session)
-        return fallback
+        return _FALLBACK_REPLY
+
+    # Booking only from here on; the calendar module (and `ics`) loads on the first booking turn
+    from calendar_integration.ics_writer import (
+        suggest_next_slot,
+        add_event_to_calendar,
+        FatalBookingError,
+        SlotConflictError,
+    )
 
-    # 1. Extract slots
+    # 1. Extract slots (mask rebuilt from state first, in case a slot was
+    # written to state directly rather than through update_slot)
+    state = session.state
+    session.sync_missing_mask()
     extract_and_prepare(user_input, session, io_adapter, config)
-    missing = [s for s in ["service", "date", "time"] if not session.state.get(s)]
 
-    # 2. Clarify
-    for slot in missing:
+    # 2. Clarify, lowest bit (service, date, time) first
+    mask = session.missing_mask
+    while mask:
+        bit = mask & -mask
+        mask &= ~bit
+        slot = _BIT_TO_SLOT[bit]
+        clarify = _SLOT_HANDLERS[slot]
         attempts = 0
-        while not session.state.get(slot):
+        while session.missing_mask & bit:
             if attempts >= max_slot_attempts:
-                io_adapter.prompt(escalation_message())
+                io_adapter.prompt(_ESCALATION)
                 mark_and_log(session, f"failed_clarify_{slot}")
                 persist_call_session(session)
-                return escalation_message()
-            if slot == "service":
-                opts = ", ".join(s.name for s in config.services)
-                ans = io_adapter.collect(f"Which service would you like to book? Options: {opts}: ")
-                if ans:
-                    session.update_slot("service", ans.strip().title())
-                    session.add_history("clarified_service", input_data=ans)
-                    log_event(call_id, "clarified_service", input_data=ans)
-            elif slot == "date":
-                ans = io_adapter.collect("What date would you like? (YYYY-MM-DD): ")
-                if ans:
-                    if validate_date_format(ans.strip()):
-                        session.update_slot("date", ans.strip())
-                        session.add_history("clarified_date", input_data=ans)
-                        log_event(call_id, "clarified_date", input_data=ans)
-                    else:
-                        io_adapter.prompt("Invalid date format. Use YYYY-MM-DD.")
-                        session.add_history("date_invalid", input_data=ans)
-                        log_event(call_id, "date_invalid", input_data=ans)
-            else:  # time
-                ans = io_adapter.collect("What time works for you? (HH:MM 24h): ")
-                if ans:
-                    if validate_time_format(ans.strip()):
-                        session.update_slot("time", ans.strip())
-                        session.add_history("clarified_time", input_data=ans)
-                        log_event(call_id, "clarified_time", input_data=ans)
-                    else:
-                        io_adapter.prompt("Invalid time format. Use HH:MM in 24h.")
-                        session.add_history("time_invalid", input_data=ans)
-                        log_event(call_id, "time_invalid", input_data=ans)
+                return _ESCALATION
+            await clarify(session, io_adapter, call_id)
             attempts += 1
 
-    # 3. Confirmation
-    svc = session.state["service"]
-    date = session.state["date"]
-    time_slot = session.state["time"]
-    paraphrase = f"Just to confirm: you want a {svc} on {date} at {time_slot}. Is that correct?"
+    # 3. Confirmation (client setup runs meanwhile, the conflict precheck
+    # alongside the LLM call)
+    _prewarm_aclient()
+    svc = state["service"]
+    date = state["date"]
+    time_slot = state["time"]
+    paraphrase = _PARAPHRASE(svc, date, time_slot)
     io_adapter.prompt(paraphrase)
     session.add_history("paraphrase_prompt", output_data=paraphrase)
     log_event(call_id, "paraphrase_prompt", output_data=paraphrase)
 
-    reply = io_adapter.collect("> ").strip().lower()
+    reply = (await _collect(io_adapter, _REPLY_PROMPT)).strip().lower()
     session.add_history("user_confirmation", input_data=reply)
     log_event(call_id, "user_confirmation", input_data=reply)
+    precheck_dt, conflict_task = _start_conflict_precheck(session)
 
-    def has_keyword(text, kws):
-        return any(kw in text for kw in kws)
-
-    confirmed = False
-    if has_keyword(reply, AFFIRMATIVE_KEYWORDS):
-        confirmed = True
-    elif has_keyword(reply, NEGATIVE_KEYWORDS):
-        confirmed = False
-    else:
-        # fallback to LLM
-        prompt_msgs = build_llm_prompt(paraphrase, session, missing_slots=[])
-        if not can_call_model():
-            io_adapter.prompt("Usage limit reached. " + escalation_message())
-            log_event(call_id, "usage_limit")
-            persist_call_session(session)
-            return escalation_message()
-        try:
-            res = client.chat.completions.create(
-                model="gpt-3.5-turbo", messages=prompt_msgs,
-                temperature=0.1, max_tokens=100
-            )
-            usage = getattr(res, "usage", {}) or {}
-            pt = usage.get("prompt_tokens", 0)
-            ct = usage.get("completion_tokens", 0)
-            total = pt + ct
-            if total:
-                record_usage(total)
-                persist_usage(call_id, total)
-            llm_text = res.choices[0].message.content.strip().lower()
-            log_event(call_id, "llm_confirmation", input_data=paraphrase, output_data=llm_text)
-            session.add_history("llm_confirmation", input_data=paraphrase, output_data=llm_text)
-            if has_keyword(llm_text, AFFIRMATIVE_KEYWORDS):
-                confirmed = True
-            elif has_keyword(llm_text, NEGATIVE_KEYWORDS):
-                confirmed = False
-            else:
-                io_adapter.prompt(escalation_message())
-                mark_and_log(session, "confirm_unclear")
-                persist_call_session(session)
-                return escalation_message()
-        except Exception as e:
-            io_adapter.prompt("Error during confirmation. " + escalation_message())
-            mark_and_log(session, "confirm_error", extra={"error": str(e)})
-            persist_call_session(session)
-            return escalation_message()
+    # keywords / reply cache first, LLM fallback
+    try:
+        confirmed = await llm_confirm_async(paraphrase, session, reply)
+    except UsageLimitError:
+        io_adapter.prompt(_USAGE_LIMIT_REPLY)
+        log_event(call_id, "usage_limit")
+        persist_call_session(session)
+        return _ESCALATION
+    except Exception as e:
+        io_adapter.prompt(_CONFIRM_ERROR_REPLY)
+        mark_and_log(session, "confirm_error", extra={"error": str(e)})
+        persist_call_session(session)
+        return _ESCALATION
+    if confirmed is None:
+        io_adapter.prompt(_ESCALATION)
+        mark_and_log(session, "confirm_unclear")
+        persist_call_session(session)
+        return _ESCALATION
 
     if not confirmed:
-        io_adapter.prompt("Okay, let's try again.")
+        io_adapter.prompt(_OKAY_TRY_AGAIN)
         session.add_history("confirm_rejected", output_data=reply)
         log_event(call_id, "confirm_rejected", output_data=reply)
         persist_call_session(session)
-        return "Okay, let's try again."
+        return _OKAY_TRY_AGAIN
 
     # 4. Booking
-    try:
-        dt = parse_local_datetime(session.state["date"], session.state["time"])
-    except Exception:
-        io_adapter.prompt(escalation_message())
+    if precheck_dt is None:
+        io_adapter.prompt(_ESCALATION)
         mark_and_log(session, "parse_error")
         persist_call_session(session)
-        return escalation_message()
+        return _ESCALATION
+    dt = precheck_dt
 
     # determine duration
-    dur = next((s.duration_minutes for s in config.services if s.name.lower() == svc.lower()), 30)
+    dur = _DURATION_BY_NAME.get(svc.lower(), 30)
     session.update_slot("duration_minutes", dur)
 
-    conflicts = has_conflict(dt, dur, ics_path=config.calendar.ics_path)
-    if conflicts:
-        io_adapter.prompt("That slot is unavailable due to a conflict.")
-        session.add_history("conflict_detected", extra={"conflicts": conflicts})
-        log_event(call_id, "conflict_detected", extra={"conflicts": conflicts})
-
-        alt = suggest_next_slot(
-            dt, dur, ics_path=config.calendar.ics_path,
-            business_start=dtime(*map(int, config.hours.open.split(":"))),
-            business_end=dtime(*map(int, config.hours.close.split(":"))),
-            interval_minutes=config.booking_slots.interval_minutes,
-            max_lookahead_days=7
-        )
-        if alt:
-            readable = alt.strftime("%Y-%m-%d %H:%M")
-            io_adapter.prompt(f"The next available slot is {readable}. Do you want that instead? (yes/no)")
-            ans = io_adapter.collect("> ").lower()
-            if any(k in ans for k in AFFIRMATIVE_KEYWORDS):
-                session.update_slot("date", alt.strftime("%Y-%m-%d"))
-                session.update_slot("time", alt.strftime("%H:%M"))
-                dt = alt
-                session.add_history("accepted_alt", input_data=readable)
-                log_event(call_id, "accepted_alt", input_data=readable)
+    # The precheck can be overtaken by a concurrent booking; the write
+    # re-checks under the calendar lock and sends us back here if so
+    conflicts, events = await conflict_task
+    while True:
+        if conflicts:
+            io_adapter.prompt(_SLOT_CONFLICT_REPLY)
+            session.add_history("conflict_detected", extra={"conflicts": conflicts})
+            log_event(call_id, "conflict_detected", extra=Lazy(lambda: {"conflicts": conflicts}))
+
+            alt = await asyncio.to_thread(
+                suggest_next_slot,
+                dt, dur, ics_path=_ICS_PATH,
+                business_start=_BIZ_START,
+                business_end=_BIZ_END,
+                interval_minutes=config.booking_slots.interval_minutes,
+                max_lookahead_days=7,
+                pre_sorted_events=events
+            )
+            if alt:
+                readable = alt.strftime("%Y-%m-%d %H:%M")
+                io_adapter.prompt(_ALT_SLOT_PROMPT(readable))
+                # classify_reply matches case-insensitively; no need to lowercase
+                ans = await _collect(io_adapter, _REPLY_PROMPT)
+                if classify_reply(ans) is True:
+                    date = sys.intern(alt.strftime("%Y-%m-%d"))
+                    time_slot = sys.intern(alt.strftime("%H:%M"))
+                    session.update_slot("date", date)
+                    session.update_slot("time", time_slot)
+                    dt = alt
+                    session.add_history("accepted_alt", input_data=readable)
+                    log_event(call_id, "accepted_alt", input_data=readable)
+                else:
+                    io_adapter.prompt(_ESCALATION)
+                    mark_and_log(session, "reject_alt")
+                    persist_call_session(session)
+                    return _ESCALATION
             else:
-                io_adapter.prompt(escalation_message())
-                mark_and_log(session, "reject_alt")
+                io_adapter.prompt(_ESCALATION)
+                mark_and_log(session, "no_alt")
                 persist_call_session(session)
-                return escalation_message()
-        else:
-            io_adapter.prompt(escalation_message())
-            mark_and_log(session, "no_alt")
-            persist_call_session(session)
-            return escalation_message()
-
-    try:
-        add_event_to_calendar(
-            f"{svc} for {session.caller_number}",
-            dt, dur,
-            description=f"Booked service: {svc}",
-            ics_path=config.calendar.ics_path
-        )
-        confirmation = f"Appointment confirmed for {svc} on {session.state['date']} at {session.state['time']}."
-        io_adapter.prompt(confirmation)
-        session.add_history("booking_confirmed", output_data=confirmation)
-        log_event(call_id, "booking_confirmed", output_data=session.state)
-
-        # persist appointment & call
-        persist_appointment({
-            "call_id": session.call_id,
-            "service": svc,
-            "date": session.state["date"],
-            "time": session.state["time"],
-            "duration_minutes": dur,
-            "created_at": datetime.now().isoformat(),
-        })
-        persist_call_session(session)
-
-        return confirmation
+                return _ESCALATION
 
-    except FatalBookingError as e:
-        io_adapter.prompt("Failed to finalize booking due to system error. " + escalation_message())
-        mark_and_log(session, "final_error", extra={"error": str(e)})
-        persist_call_session(session)
-        return escalation_message()
-    except Exception as e:
-        io_adapter.prompt("Failed to finalize booking. " + escalation_message())
-        mark_and_log(session, "final_error", extra={"error": str(e)})
-        persist_call_session(session)
-        return escalation_message()
+        try:
+            await asyncio.to_thread(
+                add_event_to_calendar,
+                f"{svc} for {session.caller_number}",
+                dt, dur,
+                description=f"Booked service: {svc}",
+                ics_path=_ICS_PATH,
+                if_free=True,
+            )
+            confirmation = f"Appointment confirmed for {svc} on {date} at {time_slot}."
+            io_adapter.prompt(confirmation)
+            session.add_history("booking_confirmed", output_data=confirmation)
+            log_event(call_id, "booking_confirmed", output_data=state)
+
+            # persist appointment & call in one rewrite of the calls file
+            persist_call_session([
+                {
+                    "call_id": call_id,
+                    "service": svc,
+                    "date": date,
+                    "time": time_slot,
+                    "duration_minutes": dur,
+                },
+                session,
+            ])
+
+            return confirmation
+
+        except SlotConflictError:
+            conflicts, events = True, None
+            continue
+        except FatalBookingError as e:
+            io_adapter.prompt(_FINALIZE_ERROR_REPLY)
+            mark_and_log(session, "final_error", extra={"error": str(e)})
+            persist_call_session(session)
+            return _ESCALATION
+        except Exception as e:
+            io_adapter.prompt(_FINALIZE_FAILED_REPLY)
+            mark_and_log(session, "final_error", extra={"error": str(e)})
+            persist_call_session(session)
+            return _ESCALATION
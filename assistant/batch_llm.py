@@ -0,0 +1,91 @@
+# assistant/batch_llm.py
+
+import json
+import time
+from typing import Optional
+
+# Batch states after which polling stops
+_TERMINAL = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchError(Exception):
+    """Raised when a submitted batch ends in a state other than completed."""
+    pass
+
+
+class ChatBatch:
+    """
+    Collects chat-completion requests as Batch API JSONL lines and submits
+    them as one job. Turnaround is up to completion_window (hours, not
+    seconds), in exchange for half-price tokens and separate rate limits, so
+    this is only for work nobody is waiting on (post-call reconciliation,
+    re-classifying replies offline).
+    """
+    def __init__(self, client, model: str = "gpt-3.5-turbo", max_tokens: int = 8,
+                 completion_window: str = "24h"):
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+        self.completion_window = completion_window
+        self._lines: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def add(self, custom_id: str, messages: list[dict]):
+        self._lines.append(json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.model,
+                "messages": messages,
+                "temperature": 0.0,
+                "max_tokens": self.max_tokens,
+            },
+        }, ensure_ascii=False))
+
+    def submit(self) -> str:
+        """
+        Upload the buffered requests and start the batch. Returns the batch id.
+        """
+        data = ("\n".join(self._lines) + "\n").encode("utf-8")
+        upload = self.client.files.create(file=("confirmations.jsonl", data), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+        )
+        self._lines.clear()
+        return batch.id
+
+    def wait(self, batch_id: str, poll_interval: float = 30.0,
+             timeout: Optional[float] = None) -> dict[str, dict]:
+        """
+        Poll until the batch finishes and return {custom_id: {"text", "usage"}}.
+        Requests that errored individually are missing from the result.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in _TERMINAL:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"batch {batch_id} still {batch.status}")
+            time.sleep(poll_interval)
+        if batch.status != "completed" or not batch.output_file_id:
+            raise BatchError(f"batch {batch_id} ended as {batch.status}")
+
+        results = {}
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            body = (row.get("response") or {}).get("body") or {}
+            if row.get("error") or not body.get("choices"):
+                continue
+            results[row["custom_id"]] = {
+                "text": body["choices"][0]["message"]["content"] or "",
+                "usage": body.get("usage") or {},
+            }
+        return results
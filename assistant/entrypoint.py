@@ -1,11 +1,16 @@
 # assistant/entrypoint.py
 
-import time
+from types import MappingProxyType
 from booking.booking import handle_booking
 from assistant.assistant import run_assistant
-from datetime import datetime
 from utils.structured_logger import log_event
 
+# Menu shown on every loop of start_assistant; built once, read-only
+_DEFAULT_MENU = MappingProxyType({
+    "1": MappingProxyType({"label": "Book an appointment", "type": "booking"}),
+    "2": MappingProxyType({"label": "Ask a question", "type": "question"}),
+})
+
 def print_menu(options: dict):
     print("\n🔧 Please select a service or action:")
     for key, val in options.items():
@@ -18,11 +23,8 @@ def start_assistant(config, phone_number, call_id, session, io_adapter):
     session.add_history("greeting", output_data="greeting sent")
     log_event(session.call_id, "greeting", output_data="greeting prompt displayed")
 
+    options = _DEFAULT_MENU
     while True:
-        options = {
-            "1": {"label": "Book an appointment", "type": "booking"},
-            "2": {"label": "Ask a question", "type": "question"},
-        }
         print_menu(options)
         selection = io_adapter.collect("Select option: ")
         session.add_history("menu_selection", input_data=selection)
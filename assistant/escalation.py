@@ -1,6 +1,6 @@
 # assistant/escalation.py
 
-from utils.structured_logger import log_event
+from utils.structured_logger import Lazy, flush as flush_log, log_event
 
 def escalation_message():
     return "I'm having trouble completing that booking. I can transfer you to a human staff member for help."
@@ -10,7 +10,7 @@ def mark_and_log(session, reason: str, extra: dict = None):
     Marks session as escalated and logs the reason.
     """
     session.escalation_triggered = True
-    payload = {"reason": reason}
-    if extra:
-        payload.update(extra)
-    log_event(session.call_id, "escalation", extra=payload)
+    log_event(session.call_id, "escalation", extra=Lazy(lambda: {"reason": reason, **(extra or {})}))
+    # escalations are what operators look at first; don't leave them queued.
+    # Callers include the async turn on the event loop, so don't wait for the disk
+    flush_log(wait=False)
@@ -0,0 +1,91 @@
+# assistant/llm_batcher.py
+
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Optional
+
+
+class LLMBatcher:
+    """
+    In-process micro-batcher for LLM requests from concurrent sessions.
+    submit() queues a request; a background task collects up to max_batch
+    of them (waiting at most max_wait seconds after the first) and issues
+    the group together, at most `concurrency` calls in flight. Each caller
+    gets its own result or exception back through a future; a caller that
+    gave up (timeout, cancel) after its request went out can still see the
+    result through its `orphaned` callback.
+
+    The worker is bound to the running event loop and is recreated when
+    submit() is called from a different loop (e.g. successive asyncio.run).
+    """
+    def __init__(
+        self,
+        call: Callable[..., Awaitable[Any]],
+        max_batch: int = 16,
+        max_wait: float = 0.05,
+        concurrency: int = 16,
+    ):
+        self.call = call
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.concurrency = concurrency
+        self._loop = None
+        self._queue: asyncio.Queue | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._worker: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    async def submit(self, *args, orphaned: Optional[Callable[[Any], None]] = None) -> Any:
+        """
+        Queue call(*args) for the next batch and wait for its result.
+        orphaned(result) runs instead if the caller is gone by the time
+        the call completes.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._inflight = set()
+            # the worker serves every caller, so it must not inherit this
+            # caller's context variables (e.g. a batched_writes() buffer)
+            self._worker = contextvars.Context().run(loop.create_task, self._collect())
+        fut = loop.create_future()
+        self._queue.put_nowait((args, fut, orphaned))
+        return await fut
+
+    async def _collect(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # fire and keep collecting; the next batch doesn't wait for this one
+            task = self._loop.create_task(self._fire(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _fire(self, batch: list):
+        await asyncio.gather(*(self._dispatch(*item) for item in batch))
+
+    async def _dispatch(self, args: tuple, fut: asyncio.Future, orphaned):
+        if fut.done():
+            # caller gave up (cancelled) before the batch went out
+            return
+        async with self._slots:
+            try:
+                result = await self.call(*args)
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+                return
+        if not fut.done():
+            fut.set_result(result)
+        elif orphaned is not None:
+            orphaned(result)
@@ -0,0 +1,38 @@
+# assistant/ratelimit.py
+
+import asyncio
+import time
+
+
+class AsyncLimiter:
+    """
+    Leaky-bucket rate limiter shared by every coroutine that uses it: at most
+    max_rate acquisitions per time_period seconds, with bursts up to max_rate.
+    Same interface as aiolimiter.AsyncLimiter (`async with limiter: ...`).
+    """
+    def __init__(self, max_rate: float, time_period: float = 60.0):
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self._per_second = max_rate / time_period
+        self._level = 0.0
+        self._last = time.monotonic()
+
+    def _leak(self):
+        now = time.monotonic()
+        self._level = max(0.0, self._level - (now - self._last) * self._per_second)
+        self._last = now
+
+    async def acquire(self):
+        # no await between the check and the increment, so this is safe on one loop
+        while True:
+            self._leak()
+            if self._level + 1 <= self.max_rate:
+                self._level += 1
+                return
+            await asyncio.sleep((self._level + 1 - self.max_rate) / self._per_second)
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc):
+        return False
@@ -0,0 +1,103 @@
+# assistant/semcache.py
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from assistant.slot_extractor import normalize_text
+from core.paths import CONFIRM_CACHE_PATH
+from utils._fastjson import dumpb
+
+# Learned replies kept (oldest dropped first)
+LEARNED_MAX = int(os.getenv("CONFIRM_CACHE_MAX", "500"))
+# Learned replies are reused for every later question, so only short replies
+# that mean the same whatever was asked are kept: "the 3pm one" or "tuesday"
+# answers one paraphrase, not the next booking's
+LEARNED_MAX_TOKENS = 2
+_CONTEXT_WORDS = frozenset({
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december",
+    "today", "tomorrow", "tonight", "morning", "afternoon", "evening", "noon",
+    "am", "pm", "one", "first", "second", "last", "earlier", "later", "next",
+})
+
+
+def _context_free(key: str) -> bool:
+    tokens = key.split()
+    return (
+        len(tokens) <= LEARNED_MAX_TOKENS
+        and not any(ch.isdigit() for ch in key)
+        and _CONTEXT_WORDS.isdisjoint(tokens)
+    )
+
+
+class ConfirmationCache:
+    """
+    Maps a caller's reply to a confirmation prompt onto "yes" / "no".
+
+    An exact lookup on the canonicalized reply, seeded with the affirm/deny
+    lexicons and extended with every reply the LLM has resolved. Only
+    context-free replies are learned (see _context_free), at most
+    LEARNED_MAX of them; they are persisted to `path` to survive restarts.
+    """
+    def __init__(
+        self,
+        affirmative: set[str],
+        negative: set[str],
+        path: Optional[Path] = None,
+    ):
+        self.path = Path(path or CONFIRM_CACHE_PATH)
+        self._lock = threading.Lock()
+        self._seed: dict[str, str] = {}
+        for kw in affirmative | {"y"}:
+            self._seed[normalize_text(kw)] = "yes"
+        for kw in negative | {"n"}:
+            self._seed[normalize_text(kw)] = "no"
+        self._learned: dict[str, str] = self._load()
+
+    def _load(self) -> dict[str, str]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+        learned = {k: v for k, v in data.items() if v in ("yes", "no") and _context_free(k)}
+        # keep the newest entries (file order is insertion order)
+        return dict(list(learned.items())[-LEARNED_MAX:]) if LEARNED_MAX else {}
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_bytes(dumpb(self._learned, indent=True))
+
+    def lookup(self, reply: str) -> Optional[str]:
+        """
+        Return "yes" / "no" for a known reply, or None on a miss.
+        """
+        key = normalize_text(reply)
+        if not key:
+            return None
+        with self._lock:
+            return self._learned.get(key) or self._seed.get(key)
+
+    def store(self, reply: str, answer: str):
+        """
+        Remember how a reply was resolved (answer is "yes" or "no"), if the
+        reply means the same without the question it answered.
+        """
+        key = normalize_text(reply)
+        if not key or answer not in ("yes", "no") or not _context_free(key) or not LEARNED_MAX:
+            return
+        with self._lock:
+            if self._seed.get(key) == answer or self._learned.get(key) == answer:
+                return
+            self._learned.pop(key, None)
+            self._learned[key] = answer
+            while len(self._learned) > LEARNED_MAX:
+                del self._learned[next(iter(self._learned))]
+            try:
+                self._save()
+            except OSError:
+                # best effort; the in-memory entry still counts
+                pass
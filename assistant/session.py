@@ -1,45 +1,163 @@
 # assistant/session.py
 
-from datetime import datetime
-import uuid
+from collections import deque
+from datetime import datetime, timezone
+import os
+import secrets
+import threading
+import time
+from utils.structured_logger import log_event
+from assistant.state_store import store_from_env
+
+# One bit per required booking slot; a set bit in missing_mask means "not filled yet"
+SLOT_BITS = {"service": 1, "date": 2, "time": 4}
+ALL_SLOTS_MASK = 1 | 2 | 4
+
+# History entries kept in memory per call; older ones are evicted to the structured log
+HISTORY_CAP = int(os.getenv("SESSION_HISTORY_CAP", "2000"))
+
+_UTC = timezone.utc
+
+# Optional shared slot store (see assistant/state_store.py): update_slot writes
+# through to it and CallSession.resume() rebuilds a call on any worker.
+# None keeps state purely in-process.
+_state_store = store_from_env()
+
+def set_state_store(store):
+    """
+    Install (or, with None, remove) the store update_slot writes through to.
+    """
+    global _state_store
+    _state_store = store
+
+def _utc_from_ns(ns: int) -> datetime:
+    # aware UTC, exact to the microsecond (no float rounding)
+    return datetime.fromtimestamp(ns // 1_000_000_000, _UTC).replace(
+        microsecond=ns // 1000 % 1_000_000
+    )
+
+def _format_entry(entry: dict) -> bool:
+    """
+    Replace a pending "timestamp_ns" with the ISO "timestamp"; False if
+    the entry was already formatted.
+    """
+    ns = entry.pop("timestamp_ns", None)
+    if ns is None:
+        return False
+    entry["timestamp"] = _utc_from_ns(ns).isoformat()
+    return True
 
 class CallSession:
     def __init__(self, call_id: str | None = None, caller_number: str = "", mode: str = "customer"):
-        self.call_id = call_id or str(uuid.uuid4())
+        # 128 random bits as 32 hex chars (uuid4 has 122), without building a UUID object
+        self.call_id = call_id or secrets.token_hex(16)
         self.caller_number = caller_number
         self.mode = mode  # "customer" or "debug"
-        self.created_at = datetime.utcnow()
-        self.updated_at = datetime.utcnow()
+        self.created_at = datetime.now(_UTC)
+        self._updated_ns = time.time_ns()
         self.state = {}  # e.g., {"service": "...", "date": "...", "time": "..."}
-        self.history = []  # chronological list of interactions
+        self.missing_mask = ALL_SLOTS_MASK  # kept in sync by update_slot / sync_missing_mask
+        # chronological interactions, bounded; new entries carry an integer
+        # "timestamp_ns" until export_history() formats it
+        self.history: deque[dict] = deque(maxlen=HISTORY_CAP)
         self.escalation_triggered = False
+        # guards state/history so background workers (persistence, prechecks)
+        # can read or write alongside the turn; reentrant since update_slot
+        # calls touch()
+        self._lock = threading.RLock()
+
+    @property
+    def updated_at(self) -> datetime:
+        return _utc_from_ns(self._updated_ns)
+
+    @classmethod
+    def resume(cls, call_id: str, caller_number: str = "", mode: str = "customer") -> "CallSession":
+        """
+        Session for an existing call with its slots loaded from the state
+        store, so any worker can take the next turn. Without a store this
+        is just a fresh session.
+        """
+        session = cls(call_id, caller_number, mode)
+        if _state_store is not None:
+            session.state = _state_store.load(call_id)
+            session.sync_missing_mask()
+        return session
+
+    def sync_missing_mask(self) -> int:
+        """
+        Recompute missing_mask from state, so slots written to state
+        directly (bypassing update_slot) count as filled. Returns the mask.
+        """
+        with self._lock:
+            mask = ALL_SLOTS_MASK
+            for key, bit in SLOT_BITS.items():
+                if self.state.get(key):
+                    mask &= ~bit
+            self.missing_mask = mask
+            return mask
 
     def update_slot(self, key: str, value):
-        self.state[key] = value
-        self.touch()
+        with self._lock:
+            self.state[key] = value
+            if _state_store is not None:
+                _state_store.save(self.call_id, key, value)
+            bit = SLOT_BITS.get(key)
+            if bit:
+                if value:
+                    self.missing_mask &= ~bit
+                else:
+                    self.missing_mask |= bit
+            self.touch()
 
     def add_history(self, step: str, input_data=None, output_data=None, extra: dict | None = None):
-        entry = {
-            "step": step,
-            "input": input_data,
-            "output": output_data,
-            "extra": extra or {},
-            "timestamp": datetime.utcnow().isoformat(),
-        }
-        self.history.append(entry)
-        self.touch()
+        # one clock read serves both the entry and updated_at; the ISO text
+        # is only built when the history is exported
+        now = time.time_ns()
+        with self._lock:
+            history = self.history
+            if len(history) == history.maxlen:
+                # the append below evicts the oldest entry; keep it in the audit trail
+                evicted = history[0]
+                _format_entry(evicted)
+                log_event(self.call_id, "history_evicted", extra=evicted)
+            history.append({
+                "step": step,
+                "input": input_data,
+                "output": output_data,
+                "extra": extra or {},
+                "timestamp_ns": now,
+            })
+            self._updated_ns = now
+
+    def export_history(self) -> list[dict]:
+        """
+        Snapshot of the history with every entry's "timestamp" as ISO-8601
+        (UTC). Each entry is formatted once, the first time it is exported.
+        """
+        with self._lock:
+            # entries are formatted oldest-first, so the pending ones are a suffix
+            for entry in reversed(self.history):
+                if not _format_entry(entry):
+                    break
+            return list(self.history)
 
     def touch(self):
-        self.updated_at = datetime.utcnow()
+        with self._lock:
+            self._updated_ns = time.time_ns()
 
     def to_dict(self):
-        return {
-            "call_id": self.call_id,
-            "caller_number": self.caller_number,
-            "mode": self.mode,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-            "state": self.state,
-            "history": self.history,
-            "escalation_triggered": self.escalation_triggered,
-        }
+        """
+        Consistent snapshot: state and history are copied under the lock, so
+        a concurrent update_slot/add_history cannot land halfway through.
+        """
+        with self._lock:
+            return {
+                "call_id": self.call_id,
+                "caller_number": self.caller_number,
+                "mode": self.mode,
+                "created_at": self.created_at.isoformat(),
+                "updated_at": self.updated_at.isoformat(),
+                "state": dict(self.state),
+                "history": self.export_history(),
+                "escalation_triggered": self.escalation_triggered,
+            }
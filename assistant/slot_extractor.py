@@ -1,27 +1,44 @@
 # assistant/slot_extractor.py
 
 import re
+from functools import lru_cache
 from assistant.session import CallSession
 from typing import Tuple, Dict, Any
 from datetime import datetime
 import difflib
 
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_WS_RE = re.compile(r"\s+")
+
 # Helper normalization
 def normalize_text(s: str) -> str:
     s = s.lower()
     s = s.replace("&", " and ")
-    s = re.sub(r"[^\w\s]", " ", s)  # remove punctuation
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _PUNCT_RE.sub(" ", s)  # remove punctuation
+    s = _WS_RE.sub(" ", s).strip()
     return s
 
+def _prepare(s: str) -> tuple[str, frozenset]:
+    norm = normalize_text(s)
+    return norm, frozenset(norm.split())
+
+@lru_cache(maxsize=32)
+def _prepare_catalogue(service_names: tuple[str, ...]) -> tuple:
+    """
+    (name, (normalized, tokens)) per service. The catalogue is the same
+    tuple on every turn, so names are lowered and split once per config.
+    """
+    return tuple((name, _prepare(name)) for name in service_names)
+
 def service_similarity(a: str, b: str) -> float:
     """
     Rough similarity: token subset shortcut, then combination of token overlap and sequence matcher ratio.
     """
-    a_norm = normalize_text(a)
-    b_norm = normalize_text(b)
-    a_tokens = set(a_norm.split())
-    b_tokens = set(b_norm.split())
+    return _similarity(_prepare(a), _prepare(b))
+
+def _similarity(a: tuple[str, frozenset], b: tuple[str, frozenset]) -> float:
+    a_norm, a_tokens = a
+    b_norm, b_tokens = b
 
     # Short-circuit: if service name tokens are subset of user input tokens, high confidence
     if a_tokens and a_tokens.issubset(b_tokens):
@@ -45,14 +62,41 @@ DATE_REGEX = re.compile(
 TIME_REGEX = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b")  # HH:MM 24h
 
 def extract_service(text: str, config) -> str | None:
-    lowered = text.lower()
+    return _match_service(text, config.service_names)
+
+def _match_service(text: str, service_names: tuple[str, ...]) -> str | None:
+    prepared = _prepare(text)
+    tokens = prepared[1]
+    names = _prepare_catalogue(service_names)
+    # Only a name whose tokens all appear scores 1.0, and nothing scores
+    # higher, so the first such name wins without running difflib at all
+    for name, (_, name_tokens) in names:
+        if name_tokens and name_tokens <= tokens:
+            return name
+    # Same score as _similarity from here on. difflib indexes seq2, so the
+    # input goes there once; a candidate is dropped as soon as the cheap
+    # upper bounds on ratio() (real_quick_ratio >= quick_ratio >= ratio)
+    # show it can neither reach 0.5 nor beat the best so far.
     best = None
     best_score = 0.0
-    for svc in config.services:
-        score = service_similarity(svc.name, lowered)
+    matcher = difflib.SequenceMatcher(None, b=prepared[0])
+    for name, (name_norm, name_tokens) in names:
+        shared = name_tokens & tokens
+        # no shared token caps the score at 0.2 (sequence part only),
+        # below the 0.5 threshold, so it can never be the answer
+        if not shared:
+            continue
+        token_part = 0.8 * (len(shared) / max(len(name_tokens), len(tokens)))
+        floor = max(best_score, 0.5)
+        matcher.set_seq1(name_norm)
+        if token_part + 0.2 * matcher.real_quick_ratio() < floor:
+            continue
+        if token_part + 0.2 * matcher.quick_ratio() < floor:
+            continue
+        score = token_part + 0.2 * matcher.ratio()
         if score > best_score:
             best_score = score
-            best = svc.name
+            best = name
     if best_score >= 0.5:
         return best
     return None
@@ -60,14 +104,13 @@ def extract_service(text: str, config) -> str | None:
 def extract_date(text: str) -> str | None:
     m = DATE_REGEX.search(text)
     if m:
+        year, month, day = m.group("year", "month", "day")
         try:
-            y = int(m.group("year"))
-            mo = int(m.group("month"))
-            d = int(m.group("day"))
-            dt = datetime(year=y, month=mo, day=d)
-            return dt.strftime("%Y-%m-%d")
-        except Exception:
+            # only rejects impossible days (e.g. 02-30); the regex fixed the widths
+            datetime(int(year), int(month), int(day))
+        except ValueError:
             return None
+        return f"{year}-{month}-{day}"
     return None
 
 def extract_time(text: str) -> str | None:
@@ -79,28 +122,41 @@ def extract_time(text: str) -> str | None:
             return f"{hh:02d}:{mm:02d}"
     return None
 
+@lru_cache(maxsize=512)
+def _extract_pure(user_input: str, service_names: tuple[str, ...],
+                  want_service: bool, want_date: bool, want_time: bool) -> tuple:
+    """
+    (service, date, time) found in user_input, None for a slot not found or
+    not wanted. No session access, so clarify loops that re-feed the same
+    text hit the cache.
+    """
+    return (
+        _match_service(user_input, service_names) if want_service else None,
+        extract_date(user_input) if want_date else None,
+        extract_time(user_input) if want_time else None,
+    )
+
 def extract_and_prepare(user_input: str, session: CallSession, io_adapter, config) -> Dict[str, Any]:
     extracted = {}
-
-    if not session.state.get("service"):
-        svc = extract_service(user_input, config)
-        if svc:
-            session.update_slot("service", svc)
-            session.add_history("extracted_service", input_data=svc)
-            extracted["service"] = svc
-
-    if not session.state.get("date"):
-        dt = extract_date(user_input)
-        if dt:
-            session.update_slot("date", dt)
-            session.add_history("extracted_date", input_data=dt)
-            extracted["date"] = dt
-
-    if not session.state.get("time"):
-        tm = extract_time(user_input)
-        if tm:
-            session.update_slot("time", tm)
-            session.add_history("extracted_time", input_data=tm)
-            extracted["time"] = tm
+    state = session.state
+    svc, dt, tm = _extract_pure(
+        user_input, config.service_names,
+        not state.get("service"), not state.get("date"), not state.get("time"),
+    )
+
+    if svc:
+        session.update_slot("service", svc)
+        session.add_history("extracted_service", input_data=svc)
+        extracted["service"] = svc
+
+    if dt:
+        session.update_slot("date", dt)
+        session.add_history("extracted_date", input_data=dt)
+        extracted["date"] = dt
+
+    if tm:
+        session.update_slot("time", tm)
+        session.add_history("extracted_time", input_data=tm)
+        extracted["time"] = tm
 
     return extracted
@@ -0,0 +1,64 @@
+# assistant/state_store.py
+
+import json
+import os
+import threading
+from typing import Optional
+
+
+class MemoryStateStore:
+    """
+    Process-local slot store; the default shape for tests and single-worker runs.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: dict[str, dict] = {}
+
+    def save(self, call_id: str, key: str, value):
+        with self._lock:
+            self._data.setdefault(call_id, {})[key] = value
+
+    def load(self, call_id: str) -> dict:
+        with self._lock:
+            return dict(self._data.get(call_id, {}))
+
+
+class RedisStateStore:
+    """
+    Slot store shared by every worker: one Redis hash per call
+    (session:<call_id>), one JSON-encoded field per slot so ints such as
+    duration_minutes come back as ints. Hashes expire `ttl` seconds after
+    the last write.
+    """
+    def __init__(self, client, ttl: int = 24 * 3600):
+        self.client = client
+        self.ttl = ttl
+
+    def _key(self, call_id: str) -> str:
+        return f"session:{call_id}"
+
+    def save(self, call_id: str, key: str, value):
+        name = self._key(call_id)
+        pipe = self.client.pipeline()
+        pipe.hset(name, key, json.dumps(value, ensure_ascii=False))
+        pipe.expire(name, self.ttl)
+        pipe.execute()
+
+    def load(self, call_id: str) -> dict:
+        raw = self.client.hgetall(self._key(call_id))
+        return {
+            (k.decode() if isinstance(k, bytes) else k): json.loads(v)
+            for k, v in raw.items()
+        }
+
+
+def store_from_env() -> Optional[RedisStateStore]:
+    """
+    RedisStateStore for SESSION_REDIS_URL, or None when it is unset.
+    The redis package is only needed once a URL is configured.
+    """
+    url = os.getenv("SESSION_REDIS_URL")
+    if not url:
+        return None
+    import redis
+    return RedisStateStore(redis.Redis.from_url(url))
@@ -1,8 +1,16 @@
 # booking/booking.py
 
-from calendar_integration.ics_writer import has_conflict, add_event_to_calendar, suggest_next_slot
-from datetime import datetime
+from calendar_integration.ics_writer import (
+    has_conflict,
+    add_event_to_calendar,
+    suggest_next_slot,
+    load_sorted_events,
+)
+from calendar import isleap
+from datetime import datetime, time as dtime
+from typing import Optional
 import re
+from zoneinfo import ZoneInfo
 from assistant.slot_extractor import extract_and_prepare
 from assistant.escalation import escalation_message, mark_and_log
 from utils.structured_logger import log_event
@@ -10,21 +18,55 @@ from utils.structured_logger import log_event
 DATE_RETRY_LIMIT = 3
 TIME_RETRY_LIMIT = 3
 
+LOCAL_TZ = ZoneInfo("America/Toronto")
+
+# Business hours used when suggesting an alternative slot
+BUSINESS_START = dtime(9, 0)
+BUSINESS_END = dtime(17, 0)
+
+# The field patterns strptime uses for "%Y-%m-%d" and "%H:%M", so unpadded
+# (and space-padded day) values are accepted exactly as before
+_DATE_PAT = r"(\d\d\d\d)-(1[0-2]|0[1-9]|[1-9])-(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])"
+_DATE_RE = re.compile(_DATE_PAT, re.I)
+_DATETIME_RE = re.compile(_DATE_PAT + r"\s+(2[0-3]|[0-1]\d|\d):([0-5]\d|\d)", re.I)
+_VALID_TIME_RE = re.compile(r"^([01]?\d|2[0-3]):[0-5]\d$")
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# (services list, lowercased name -> duration) for the last list seen; the
+# dict config is loaded once, so bookings keep passing the same list
+_durations_for: Optional[tuple[list, dict]] = None
+
+def _service_durations(services: list) -> dict:
+    global _durations_for
+    cached = _durations_for
+    if cached is None or cached[0] is not services:
+        durations = {}
+        for s in services:
+            # first definition wins, like a front-to-back scan
+            durations.setdefault(s.get("name", "").lower(), s.get("duration_minutes", 30))
+        cached = _durations_for = (services, durations)
+    return cached[1]
+
+def _real_date(y: int, mo: int, d: int) -> bool:
+    return y >= 1 and d <= _DAYS_IN_MONTH[mo - 1] + (mo == 2 and isleap(y))
+
 def is_valid_date(date_str):
-    try:
-        datetime.strptime(date_str, "%Y-%m-%d")
-        return True
-    except ValueError:
-        return False
+    m = _DATE_RE.fullmatch(date_str)
+    return m is not None and _real_date(int(m[1]), int(m[2]), int(m[3]))
 
 def is_valid_time(time_str):
-    return re.match(r"^([01]?\d|2[0-3]):[0-5]\d$", time_str) is not None
+    return _VALID_TIME_RE.match(time_str) is not None
 
 def parse_local_datetime(date_str: str, time_str: str):
-    from zoneinfo import ZoneInfo
-    LOCAL_TZ = ZoneInfo("America/Toronto")
-    dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
-    return dt.replace(tzinfo=LOCAL_TZ)
+    # same acceptance as strptime("%Y-%m-%d %H:%M"), without its format machinery
+    text = f"{date_str} {time_str}"
+    m = _DATETIME_RE.fullmatch(text)
+    if m is None:
+        raise ValueError(f"time data {text!r} does not match format '%Y-%m-%d %H:%M'")
+    y, mo, d = int(m[1]), int(m[2]), int(m[3])
+    if not _real_date(y, mo, d):
+        raise ValueError("day is out of range for month")
+    return datetime(y, mo, d, int(m[4]), int(m[5]), tzinfo=LOCAL_TZ)
 
 def handle_booking(config: dict, phone_number: str, call_id: str, session, io_adapter):
     """
@@ -80,37 +122,33 @@ def handle_booking(config: dict, phone_number: str, call_id: str, session, io_ad
         return
 
     # Lookup service duration safely
-    services = config.get("services", [])
-    duration = 30
-    for s in services:
-        if s.get("name", "").lower() == service.lower():
-            duration = s.get("duration_minutes", 30)
-            break
+    duration = _service_durations(config.get("services", [])).get(service.lower(), 30)
     session.update_slot("duration_minutes", duration)
 
+    ics_path = config["calendar"].get("ics_path")
+    # parsed once here, shared by the conflict check and the suggestion search
+    events = load_sorted_events(ics_path)
+
     # Conflict detection
-    conflicts = has_conflict(desired_dt, duration, ics_path=config["calendar"].get("ics_path"))
+    conflicts = has_conflict(desired_dt, duration, pre_sorted_events=events)
     if conflicts:
         io_adapter.prompt("The requested slot is unavailable due to a conflict.")
         session.add_history("conflict_detected", extra={"conflicts": conflicts})
         log_event(session.call_id, "conflict_detected", extra={"conflicts": conflicts})
 
         # Attempt next available suggestion
-        # Business hours fallback to config or defaults
-        from datetime import time as dtime
-        business_start = dtime(9, 0)
-        business_end = dtime(17, 0)
         booking_slots = config.get("booking_slots", {})
         interval = booking_slots.get("interval_minutes", 30)
 
         suggestion = suggest_next_slot(
             desired_dt,
             duration,
-            ics_path=config["calendar"].get("ics_path"),
-            business_start=business_start,
-            business_end=business_end,
+            ics_path=ics_path,
+            business_start=BUSINESS_START,
+            business_end=BUSINESS_END,
             interval_minutes=interval,
-            max_lookahead_days=7
+            max_lookahead_days=7,
+            pre_sorted_events=events
         )
 
         if suggestion:
@@ -136,7 +174,7 @@ def handle_booking(config: dict, phone_number: str, call_id: str, session, io_ad
     try:
         title = f"{service} for {phone_number}"
         description = f"Booked service: {service}"
-        add_event_to_calendar(title, desired_dt, duration, description, ics_path=config["calendar"].get("ics_path"))
+        add_event_to_calendar(title, desired_dt, duration, description, ics_path=ics_path, if_free=True)
         io_adapter.confirm(f"Appointment confirmed for {service} on {desired_dt.strftime('%Y-%m-%d')} at {desired_dt.strftime('%H:%M')}.")
         session.add_history("booking_confirmed", output_data={"service": service, "datetime": desired_dt.isoformat()})
         log_event(session.call_id, "booking_confirmed", output_data=session.state)
@@ -1,14 +1,17 @@
 # calendar_integration/ics_writer.py
 
-import json
+import os
+import re
 import threading
-from datetime import datetime, timedelta, time as dtime
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone, time as dtime
 from pathlib import Path
-from typing import Optional
+from typing import NamedTuple, Optional
 
 from ics import Calendar, Event
 
 from core.paths import BASE_DATA_DIR
+from utils._fastjson import dumpb
 
 # Paths
 ICS_PATH_DEFAULT = Path(BASE_DATA_DIR) / "calendar" / "appointments.ics"
@@ -16,10 +19,77 @@ JSON_PATH        = Path(BASE_DATA_DIR) / "calendar" / "appointments.json"
 
 _lock = threading.Lock()
 
+class EventIndex(NamedTuple):
+    """
+    Calendar events reduced to (begin, end) pairs, sorted by begin.
+    max_end[i] is the latest end among events 0..i, so "does anything starting
+    before X end after Y" is one bisect plus one lookup.
+    """
+    starts: list[datetime]
+    ends: list[datetime]
+    max_end: list[datetime]
+
+    def blocking_end(self, begin: datetime, end: datetime) -> Optional[datetime]:
+        """
+        If any event overlaps [begin, end), the latest end among them;
+        no slot of the same length starting before that time can be free.
+        """
+        k = bisect_left(self.starts, end)
+        if k and self.max_end[k - 1] > begin:
+            return self.max_end[k - 1]
+        return None
+
+    def overlaps(self, begin: datetime, end: datetime) -> bool:
+        """True iff any event overlaps [begin, end)."""
+        return self.blocking_end(begin, end) is not None
+
+    def insert(self, begin: datetime, end: datetime) -> "EventIndex":
+        """
+        A new index with the event added where _build_index would sort it.
+        Copies instead of mutating, since readers use indexes outside _lock.
+        """
+        starts, ends, max_end = self.starts, self.ends, self.max_end
+        lo, hi = bisect_left(starts, begin), bisect_right(starts, begin)
+        k = bisect_right(ends, end, lo, hi)
+        # max_end is non-decreasing: the entries the new end raises are a run from k
+        j = bisect_left(max_end, end, k)
+        top = max_end[k - 1] if k and max_end[k - 1] > end else end
+        return EventIndex(
+            starts[:k] + [begin] + starts[k:],
+            ends[:k] + [end] + ends[k:],
+            max_end[:k] + [top] + [end] * (j - k) + max_end[j:],
+        )
+
+# Parsed calendars keyed by path, reused while (mtime_ns, size) is unchanged.
+# The Calendar is None until a full rewrite needs it (readers and appends only
+# keep the index); the cached one is never mutated, writers work on a clone().
+_ICS_CACHE: dict[Path, tuple[tuple[int, int], Optional[Calendar], EventIndex]] = {}
+
+# DATE-TIME in UTC ("Z") or floating form, which ics also reads as UTC
+_ICS_DT_RE = re.compile(r"(\d{4})(\d\d)(\d\d)T(\d\d)(\d\d)(\d\d)Z?")
+_ICS_DURATION_RE = re.compile(r"P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?")
+_SPAN_PROPS = ("DTSTART", "DTEND", "DURATION")
+
+# Bookings append one VEVENT in front of the closing line instead of
+# re-serializing the whole calendar, insert into the cached index and append to
+# the JSON mirror; every ICS_COMPACT_EVERY appends (or when the file changed
+# behind our back) the next write is a full rewrite of both files.
+ICS_COMPACT_EVERY = int(os.getenv("ICS_COMPACT_EVERY", "100"))
+_FOOTER = b"END:VCALENDAR"
+# path -> ((mtime_ns, size) our last write left, appends since the last rewrite)
+_APPENDS: dict[Path, tuple[tuple[int, int], int]] = {}
+# ics path -> (mtime_ns, size) of JSON_PATH after we last mirrored that calendar;
+# the mirror is only appended to while it is still exactly that
+_JSON_STAMPS: dict[Path, tuple[int, int]] = {}
+
 class FatalBookingError(Exception):
     """Raised when we cannot write to the calendar."""
     pass
 
+class SlotConflictError(Exception):
+    """Raised by add_event_to_calendar(if_free=True) when the slot is taken."""
+    pass
+
 def load_calendar(ics_path: Optional[Path] = None) -> Calendar:
     if ics_path is None:
         ics_path = ICS_PATH_DEFAULT
@@ -38,77 +108,284 @@ def load_calendar(ics_path: Optional[Path] = None) -> Calendar:
         # corrupt → fresh Calendar
         return Calendar()
 
-def _dump_calendar_json(ics_path: Path):
+def _ics_datetime(value: Optional[str]) -> Optional[datetime]:
+    m = _ICS_DT_RE.fullmatch(value) if value is not None else None
+    if m is None:
+        return None
+    try:
+        return datetime(*map(int, m.groups()), tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+def _event_span(props: dict) -> Optional[tuple[datetime, datetime]]:
+    begin = _ics_datetime(props.get("DTSTART"))
+    if begin is None:
+        return None
+    if "DTEND" in props:
+        if "DURATION" in props:
+            return None
+        end = _ics_datetime(props["DTEND"])
+    elif "DURATION" in props:
+        m = _ICS_DURATION_RE.fullmatch(props["DURATION"])
+        if m is None or not any(m.groups()):
+            return None
+        w, d, h, mi, sec = (int(g or 0) for g in m.groups())
+        end = begin + timedelta(weeks=w, days=d, hours=h, minutes=mi, seconds=sec)
+    else:
+        end = begin
+    if end is None or end < begin:
+        return None
+    return begin, end
+
+def _scan_events(text: str) -> Optional[list[tuple[datetime, datetime]]]:
+    """
+    (begin, end) of every VEVENT, read straight off the lines of a plain
+    calendar like the ones this module writes: UTC or floating DTSTART,
+    DTEND or DURATION, no property parameters, no other components.
+    None for anything else, so the caller falls back to the ics parser.
+    """
+    lines = text.splitlines()
+    if len(lines) < 2 or lines[0] != "BEGIN:VCALENDAR" or lines[-1] != "END:VCALENDAR":
+        return None
+    pairs = []
+    has_prodid = False
+    props = None  # span properties of the open VEVENT
+    folding = False  # last line was a span property; it must not continue
+    for line in lines[1:-1]:
+        if not line or (folding and line[0] in " \t"):
+            return None
+        folding = False
+        if line.startswith(("BEGIN:", "END:")):
+            if props is None and line == "BEGIN:VEVENT":
+                props = {}
+            elif props is not None and line == "END:VEVENT":
+                span = _event_span(props)
+                if span is None:
+                    return None
+                pairs.append(span)
+                props = None
+            else:
+                return None
+        elif props is None:
+            has_prodid = has_prodid or line.startswith("PRODID:")
+        else:
+            name, _, value = line.partition(":")
+            if name.partition(";")[0] in _SPAN_PROPS:
+                if name not in _SPAN_PROPS or name in props:
+                    return None
+                props[name] = value
+                folding = True
+    if props is not None or not has_prodid:
+        return None
+    return pairs
+
+def _index_events(cal: Calendar) -> EventIndex:
+    # use aware datetimes for comparison
+    return _build_index((ev.begin.datetime, ev.end.datetime) for ev in cal.events)
+
+def _build_index(spans) -> EventIndex:
+    pairs = sorted(spans)
+    starts = [b for b, _ in pairs]
+    ends = [e for _, e in pairs]
+    max_end = []
+    for e in ends:
+        max_end.append(e if not max_end or e > max_end[-1] else max_end[-1])
+    return EventIndex(starts, ends, max_end)
+
+def _file_stamp(ics_path: Path) -> tuple[int, int]:
+    st = ics_path.stat()
+    return st.st_mtime_ns, st.st_size
+
+def _current_stamp(ics_path: Path) -> tuple[int, int]:
+    try:
+        return _file_stamp(ics_path)
+    except FileNotFoundError:
+        load_calendar(ics_path)  # creates an empty calendar file
+        return _file_stamp(ics_path)
+
+def _cached_index(ics_path: Path) -> EventIndex:
+    """
+    EventIndex for the file, rebuilt only when it changed on disk. Plain
+    calendars are line-scanned; only unusual ones go through ics.Calendar.
+    """
+    stamp = _current_stamp(ics_path)
+    cached = _ICS_CACHE.get(ics_path)
+    if cached and cached[0] == stamp:
+        return cached[2]
+    try:
+        spans = _scan_events(ics_path.read_text(encoding="utf-8"))
+    except ValueError:  # undecodable; let load_calendar report it as before
+        spans = None
+    if spans is None:
+        cal = load_calendar(ics_path)
+        index = _index_events(cal)
+    else:
+        cal = None
+        index = _build_index(spans)
+    _ICS_CACHE[ics_path] = (stamp, cal, index)
+    return index
+
+def _cached_calendar(ics_path: Path) -> Calendar:
+    """
+    Parsed Calendar for the file, re-parsing only when it changed on disk
+    or when only its index was cached so far.
+    """
+    stamp = _current_stamp(ics_path)
+    cached = _ICS_CACHE.get(ics_path)
+    fresh = cached is not None and cached[0] == stamp
+    if fresh and cached[1] is not None:
+        return cached[1]
+    cal = load_calendar(ics_path)
+    index = cached[2] if fresh else _index_events(cal)
+    _ICS_CACHE[ics_path] = (stamp, cal, index)
+    return cal
+
+def load_sorted_events(ics_path: Optional[Path] = None) -> EventIndex:
+    """
+    Return the calendar's EventIndex, re-reading the ICS file only when it
+    changed on disk since the last call.
+    """
+    ics_path = Path(ics_path) if ics_path is not None else ICS_PATH_DEFAULT
+    return _cached_index(ics_path)
+
+def _event_json(ev: Event) -> dict:
+    # ev.begin.datetime and ev.end.datetime are aware datetimes
+    return {
+        "summary":     ev.name,
+        "description": ev.description,
+        "begin":       ev.begin.datetime.isoformat(),
+        "end":         ev.end.datetime.isoformat(),
+        "uid":         ev.uid,
+    }
+
+def _dump_calendar_json(cal: Calendar):
     JSON_PATH.parent.mkdir(parents=True, exist_ok=True)
+    JSON_PATH.write_bytes(dumpb([_event_json(ev) for ev in cal.events], indent=True))
+
+def _append_calendar_json(ev: Event) -> bool:
+    """
+    Add ev to the end of the JSON mirror in place. False, with the file
+    untouched, if it is missing or not a list as _dump_calendar_json writes it.
+    """
+    entry = dumpb([_event_json(ev)], indent=True)  # b"[\n  {...}\n]"
     try:
-        cal = Calendar(ics_path.read_text(encoding="utf-8"))
-    except Exception:
-        JSON_PATH.write_text("[]", encoding="utf-8")
-        return
-
-    events = []
-    for ev in cal.events:
-        # ev.begin.datetime and ev.end.datetime are aware datetimes
-        events.append({
-            "summary":     ev.name,
-            "description": ev.description,
-            "begin":       ev.begin.datetime.isoformat(),
-            "end":         ev.end.datetime.isoformat(),
-            "uid":         ev.uid,
-        })
-    JSON_PATH.write_text(json.dumps(events, ensure_ascii=False, indent=2), encoding="utf-8")
+        with open(JSON_PATH, "r+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size < 2:
+                return False
+            f.seek(-2, os.SEEK_END)
+            tail = f.read()
+            if tail == b"\n]":
+                f.seek(-2, os.SEEK_END)
+                f.write(b"," + entry[1:])
+            elif size == 2 and tail == b"[]":
+                f.seek(0)
+                f.write(entry)
+            else:
+                return False
+    except FileNotFoundError:
+        return False
+    return True
+
+def _append_event(ics_path: Path, ev: Event) -> bool:
+    """
+    Splice ev in before the closing END:VCALENDAR. False, with the file
+    untouched, if it does not end that way.
+    """
+    with open(ics_path, "r+b") as f:
+        f.seek(-len(_FOOTER), os.SEEK_END)
+        if f.read() != _FOOTER:
+            return False
+        f.seek(-len(_FOOTER), os.SEEK_END)
+        f.write(ev.serialize().encode("utf-8") + b"\r\n" + _FOOTER)
+    return True
 
 def add_event_to_calendar(
     title: str,
     start_dt: datetime,
     duration_minutes: int,
     description: str,
-    ics_path: Optional[Path] = None
+    ics_path: Optional[Path] = None,
+    if_free: bool = False
 ):
-    if ics_path is None:
-        ics_path = ICS_PATH_DEFAULT
+    """
+    Book the event. With if_free=True the overlap check is repeated under
+    the write lock and SlotConflictError raised instead of double-booking,
+    so a check made earlier (outside the lock) cannot go stale.
+    """
+    ics_path = Path(ics_path) if ics_path is not None else ICS_PATH_DEFAULT
 
     with _lock:
-        cal = load_calendar(ics_path)
+        index = _cached_index(ics_path)
         ev = Event()
         ev.name = title
-        ev.begin = start_dt
+        # the ICS text stores UTC; holding the same here keeps the cached
+        # index identical to what parsing the file back would give
+        ev.begin = start_dt if start_dt.tzinfo is None else start_dt.astimezone(timezone.utc)
         ev.duration = timedelta(minutes=duration_minutes)
         ev.description = description
-        cal.events.add(ev)
+        begin, end = ev.begin.datetime, ev.end.datetime
+        if if_free and index.overlaps(begin, end):
+            raise SlotConflictError(f"{start_dt.isoformat()} is already booked")
 
         try:
             ics_path.parent.mkdir(parents=True, exist_ok=True)
-            # use .serialize() to avoid FutureWarning, but str(cal) still works
-            ics_path.write_text(cal.serialize(), encoding="utf-8")
+            # appending is only safe on a file still exactly as we left it
+            last = _APPENDS.get(ics_path)
+            appends = last[1] + 1 if last else 0
+            appended = (
+                last is not None
+                and last[0] == _file_stamp(ics_path)
+                and appends < ICS_COMPACT_EVERY
+                and _append_event(ics_path, ev)
+            )
+            if appended:
+                # the Calendar is only needed again at the next compaction
+                cal = None
+                index = index.insert(begin, end)
+            else:
+                appends = 0
+                cal = _cached_calendar(ics_path).clone()
+                cal.events.add(ev)
+                # use .serialize() to avoid FutureWarning, but str(cal) still works
+                ics_path.write_text(cal.serialize(), encoding="utf-8")
+                index = _index_events(cal)
+            stamp = _file_stamp(ics_path)
         except Exception as e:
+            _ICS_CACHE.pop(ics_path, None)
+            _APPENDS.pop(ics_path, None)
             raise FatalBookingError(f"Failed to write calendar: {e}")
+        _APPENDS[ics_path] = (stamp, appends)
+        # what was just written is what the next reader would parse back
+        _ICS_CACHE[ics_path] = (stamp, cal, index)
 
-        # mirror to JSON
+        # mirror to JSON: appended alongside the ICS, rewritten when it is
         try:
-            _dump_calendar_json(ics_path)
+            if cal is None and not (
+                JSON_PATH.exists()
+                and _JSON_STAMPS.get(ics_path) == _file_stamp(JSON_PATH)
+                and _append_calendar_json(ev)
+            ):
+                cal = _cached_calendar(ics_path)
+            if cal is not None:
+                _dump_calendar_json(cal)
+            _JSON_STAMPS[ics_path] = _file_stamp(JSON_PATH)
         except Exception:
-            pass
+            _JSON_STAMPS.pop(ics_path, None)
 
 def has_conflict(
     desired_dt: datetime,
     duration_minutes: int,
-    ics_path: Optional[Path] = None
+    ics_path: Optional[Path] = None,
+    pre_sorted_events: Optional[EventIndex] = None
 ) -> bool:
     """
     Return True iff there is any event overlapping
     [desired_dt, desired_dt + duration_minutes).
+    Pass pre_sorted_events (from load_sorted_events) to skip the file check.
     """
-    cal = load_calendar(ics_path)
-    end_dt = desired_dt + timedelta(minutes=duration_minutes)
-
-    for ev in cal.events:
-        # use aware datetimes for comparison
-        begin = ev.begin.datetime
-        end   = ev.end.datetime
-        if begin < end_dt and end > desired_dt:
-            return True
-    return False
+    events = pre_sorted_events if pre_sorted_events is not None else load_sorted_events(ics_path)
+    return events.overlaps(desired_dt, desired_dt + timedelta(minutes=duration_minutes))
 
 def suggest_next_slot(
     desired_dt: datetime,
@@ -117,26 +394,42 @@ def suggest_next_slot(
     business_start: dtime,
     business_end: dtime,
     interval_minutes: int,
-    max_lookahead_days: int = 7
+    max_lookahead_days: int = 7,
+    pre_sorted_events: Optional[EventIndex] = None
 ) -> Optional[datetime]:
-    cal = load_calendar(ics_path)
+    events = pre_sorted_events if pre_sorted_events is not None else load_sorted_events(ics_path)
     slot = desired_dt
     delta = timedelta(minutes=duration_minutes)
+    step = timedelta(minutes=interval_minutes)
     cutoff = desired_dt + timedelta(days=max_lookahead_days)
 
     while slot < cutoff:
         slot_end = slot + delta
         # check business hours
         if business_start <= slot.time() < business_end and slot_end.time() <= business_end:
-            conflict = False
-            for ev in cal.events:
-                begin = ev.begin.datetime
-                end   = ev.end.datetime
-                if begin < slot_end and end > slot:
-                    conflict = True
-                    break
-            if not conflict:
+            blocked_until = events.blocking_end(slot, slot_end)
+            if blocked_until is None:
                 return slot
-        slot += timedelta(minutes=interval_minutes)
+            # Every candidate before blocked_until still overlaps the same event,
+            # so jump to the first one on the interval grid at or after it.
+            # The correction loops absorb DST shifts between wall-clock steps
+            # and the absolute time difference.
+            nxt = slot + step * max(1, -(-(blocked_until - slot) // step))
+            while nxt - step > slot and nxt - step >= blocked_until:
+                nxt -= step
+            while nxt < blocked_until:
+                nxt += step
+            slot = nxt
+            continue
+        if not business_start <= slot.time() < business_end:
+            # Closed: every grid point before the next opening fails the same
+            # check. Same tzinfo on both sides, so this is wall-clock
+            # arithmetic, exactly like repeated slot += step.
+            opening = datetime.combine(slot.date(), business_start, slot.tzinfo)
+            if opening <= slot:
+                opening += timedelta(days=1)
+            slot += step * max(1, -(-(opening - slot) // step))
+            continue
+        slot += step
 
     return None
@@ -7,11 +7,17 @@ import os
 from core.config_schema import RootConfig
 import re
 from datetime import datetime
+from functools import lru_cache
 
 # Path constants (adjust if your layout differs)
 DEFAULT_CONFIG_PATH = Path("config/demo_config.json")
 DEFAULT_ENV_PATH = Path("secrets/.env")
 
+# Bumped on every successful load_config() so derived caches can be invalidated
+_config_version = 0
+# (mtime_ns, size) of the config file -> RootConfig built from it
+_config_cache: tuple[tuple[int, int], RootConfig] | None = None
+
 
 def parse_business_hours_string(s: str):
     """
@@ -59,11 +65,22 @@ def load_raw_config(path: Path = DEFAULT_CONFIG_PATH) -> dict:
         return json.load(f)
 
 
-def load_config() -> RootConfig:
+def load_config(force: bool = False) -> RootConfig:
     """
     Loads environment variables and the JSON config, normalizes legacy formats,
     validates against schema, and returns a typed RootConfig instance.
+    Returns the previous instance while the config file is unchanged on disk,
+    unless force=True.
     """
+    global _config_version, _config_cache
+    try:
+        st = DEFAULT_CONFIG_PATH.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None  # load_raw_config reports the missing file
+    if not force and stamp is not None and _config_cache and _config_cache[0] == stamp:
+        return _config_cache[1]
+
     # Load .env early so any env overrides are present
     if DEFAULT_ENV_PATH.exists():
         load_dotenv(dotenv_path=DEFAULT_ENV_PATH)
@@ -80,15 +97,28 @@ def load_config() -> RootConfig:
         config = RootConfig(**raw)
         # Ensure calendar directory exists (creates parent if needed)
         config.calendar.ensure_parent()
-        return config
     except Exception as e:
         # Fail fast with clear message
         raise RuntimeError(f"Configuration validation failed: {e}") from e
+    _config_version += 1
+    if stamp is not None:
+        _config_cache = (stamp, config)
+    return config
+
+
+def get_config_version() -> int:
+    """
+    Returns a counter that increases each time load_config() succeeds.
+    Used as part of cache keys for anything derived from the config.
+    """
+    return _config_version
 
 
+@lru_cache(maxsize=1)
 def load_env_variables() -> dict:
     """
     Loads required environment variables (e.g., OPENAI_API_KEY) into a plain dict.
+    Read once per process; a failed load (missing key) is not cached.
     """
     if DEFAULT_ENV_PATH.exists():
         load_dotenv(dotenv_path=DEFAULT_ENV_PATH)
@@ -1,8 +1,10 @@
 # core/config_schema.py
 
-from pydantic import BaseModel, Field, field_validator, ValidationError
-from typing import List, Optional
+from pydantic import BaseModel, Field, PrivateAttr, field_validator, ValidationError
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
+from datetime import time as dtime
+import re
 
 
 class ServiceConfig(BaseModel):
@@ -25,6 +27,22 @@ class HoursConfig(BaseModel):
     open: str = Field(..., pattern=r"^\d{2}:\d{2}$")  # "09:00"
     close: str = Field(..., pattern=r"^\d{2}:\d{2}$")  # "17:00"
 
+    # open / close as time objects, parsed once per loaded config
+    _open_time: Optional[dtime] = PrivateAttr(default=None)
+    _close_time: Optional[dtime] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context) -> None:
+        self._open_time = dtime(*map(int, self.open.split(":")))
+        self._close_time = dtime(*map(int, self.close.split(":")))
+
+    @property
+    def open_time(self) -> dtime:
+        return self._open_time
+
+    @property
+    def close_time(self) -> dtime:
+        return self._close_time
+
 
 class CalendarConfig(BaseModel):
     ics_path: Path
@@ -39,9 +57,61 @@ class RootConfig(BaseModel):
     booking_slots: BookingSlotsConfig = BookingSlotsConfig()
     hours: HoursConfig
     calendar: CalendarConfig
+    faq: Dict[str, str] = Field(default_factory=dict)
 
     @field_validator("services")
     def must_have_at_least_one_service(cls, v):
         if not v:
             raise ValueError("At least one service must be defined")
         return v
+
+    # Lookups derived from `services`, built once per loaded config
+    _services_by_name: Dict[str, ServiceConfig] = PrivateAttr(default_factory=dict)
+    _service_prefixes: Dict[str, List[str]] = PrivateAttr(default_factory=dict)
+    _services_re: Optional[re.Pattern] = PrivateAttr(default=None)
+    _lowered_names: List[str] = PrivateAttr(default_factory=list)
+    _service_names: Tuple[str, ...] = PrivateAttr(default=())
+    _faq_norm: Dict[str, str] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context) -> None:
+        by_name: Dict[str, ServiceConfig] = {}
+        self._lowered_names = [s.name.lower() for s in self.services]
+        self._service_names = tuple(s.name for s in self.services)
+        for s in self.services:
+            # first definition wins, matching a front-to-back scan
+            by_name.setdefault(s.name.lower(), s)
+        self._services_by_name = by_name
+        names = sorted(by_name, key=len, reverse=True)
+        # A match at a position only reports the longest name starting there,
+        # so remember which shorter names are prefixes of it
+        self._service_prefixes = {n: [m for m in names if n.startswith(m)] for n in names}
+        # Zero-width lookahead so overlapping mentions are all found in one pass
+        self._services_re = re.compile("(?=(" + "|".join(map(re.escape, names)) + "))")
+        self._faq_norm = {q.lower().strip(): a for q, a in self.faq.items()}
+
+    @property
+    def service_names(self) -> Tuple[str, ...]:
+        """Service names in config order; hashable, so usable as a cache key."""
+        return self._service_names
+
+    def service_by_name(self, name: str) -> Optional[ServiceConfig]:
+        """
+        Case-insensitive O(1) lookup of a service by its exact name.
+        """
+        return self._services_by_name.get(name.lower())
+
+    def services_mentioned(self, lowered_text: str) -> List[ServiceConfig]:
+        """
+        Services whose (lowercased) name occurs anywhere in lowered_text,
+        in config order.
+        """
+        hits = set()
+        for m in self._services_re.finditer(lowered_text):
+            hits.update(self._service_prefixes[m.group(1)])
+        return [s for s, n in zip(self.services, self._lowered_names) if n in hits]
+
+    def faq_answer(self, lowered_text: str) -> Optional[str]:
+        """
+        Answer for an FAQ question asked verbatim (case/outer whitespace ignored).
+        """
+        return self._faq_norm.get(lowered_text.strip())
@@ -9,12 +9,21 @@ BASE_DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
 # Calendar .ics
 CALENDAR_ICS_PATH = BASE_DATA_DIR / "calendar" / "appointments.ics"
 
-# Usage JSON
+# Usage JSON (cumulative total for the usage guard)
 USAGE_JSON_PATH = BASE_DATA_DIR / "usage" / "usage.json"
 
+# Per-call usage events (kept apart from the guard's running total)
+USAGE_EVENTS_PATH = BASE_DATA_DIR / "usage" / "usage_events.json"
+
 # Call/session JSON
 CALLS_JSON_PATH = BASE_DATA_DIR / "calls" / "calls.json"
 
+# Write-ahead files for persistence batches not yet merged into the JSON stores
+PERSIST_WAL_DIR = BASE_DATA_DIR / "wal"
+
+# Confirmation reply cache (learned yes/no answers)
+CONFIRM_CACHE_PATH = BASE_DATA_DIR / "cache" / "confirm_cache.json"
+
 # Structured logging NDJSON file + archive dir
 STRUCT_LOG_DIR     = BASE_DATA_DIR / "logs"
 STRUCT_LOG_FILE    = STRUCT_LOG_DIR / "structured_calls.ndjson"
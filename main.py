@@ -3,6 +3,7 @@
 
 # 1) Auto-load your .env from the `secrets/` directory
 from dotenv import load_dotenv
+import asyncio
 import os
 import sys
 from pathlib import Path
@@ -28,19 +29,24 @@ sys.path.insert(0, str(PROJECT_ROOT))
 os.environ.setdefault("DATA_DIR", str(PROJECT_ROOT / "data"))
 
 # 4) Core imports
-from openai import OpenAI
-from core.config_loader import load_env_variables, load_config
+from core.config_loader import load_config
 from utils.usage_guard import can_call_model, record_usage
 from utils.structured_logger import log_event
-from assistant.assistant import process_interaction
+from utils.persistence import replay_wal
+from assistant.assistant import process_interaction_async, aclose_clients
 from assistant.session import CallSession
 from io_adapters.console_adapter import ConsoleAdapter
 
-def main():
-    # Load environment & config
-    env    = load_env_variables()
-    client = OpenAI(api_key=env["OPENAI_API_KEY"])
+async def _read(read_line, prompt_text: str) -> str:
+    # Blocking console reads run on a worker thread so the event loop (and
+    # anything still in flight on it) keeps going while the caller types
+    return await asyncio.to_thread(read_line, prompt_text)
+
+async def main():
+    # Load config (the assistant module owns the shared AsyncOpenAI client)
     config = load_config()
+    # merge persistence batches a previous run left unmerged
+    replay_wal()
 
     print("AI Receptionist CLI")
     print("Type 'exit' or Ctrl-D to quit.")
@@ -48,7 +54,7 @@ def main():
 
     while True:
         try:
-            number = input(">>> New call! Enter customer phone number: ").strip()
+            number = (await _read(input, ">>> New call! Enter customer phone number: ")).strip()
         except (EOFError, KeyboardInterrupt):
             print("\nGoodbye!")
             break
@@ -64,7 +70,7 @@ def main():
 
         while True:
             try:
-                user_input = io_adapter.collect("> ")
+                user_input = await _read(io_adapter.collect, "> ")
             except (EOFError, KeyboardInterrupt):
                 print("\nCall ended.")
                 break
@@ -74,7 +80,7 @@ def main():
                 break
 
             try:
-                process_interaction(user_input, session, io_adapter)
+                await process_interaction_async(user_input, session, io_adapter)
             except Exception as e:
                 # Unexpected error → escalate
                 io_adapter.prompt("Sorry, something went wrong. Transferring you to a human.")
@@ -82,5 +88,9 @@ def main():
 
         # back to “New call” loop
 
+    # drop the pooled connections while the loop that owns them is still running
+    await aclose_clients()
+
 if __name__ == "__main__":
-    main()
+    # One event loop for the whole CLI session so the async OpenAI client keeps its connections
+    asyncio.run(main())
@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
+import asyncio
+import json
 import os
 import sys
 import tempfile
 import re
 from pathlib import Path
+from types import SimpleNamespace
 
 # 1) (Optional) isolate data in a fresh temp dir
 # import shutil
@@ -21,16 +24,39 @@ import assistant.assistant as A
 from assistant.assistant import llm_confirm, process_interaction, UsageLimitError
 from assistant.session import CallSession
 from assistant.escalation import escalation_message
+from assistant.semcache import ConfirmationCache
 
 # --- Helpers ---
 
-class FakeResponse:
-    """Mimic an OpenAI chat completion response."""
+class FakeStream:
+    """Mimic a streamed chat completion: one chunk per word, then a usage chunk."""
     def __init__(self, text, pt=1, ct=1):
-        self.choices = [
-            type("Choice", (), {"message": type("Msg", (), {"content": text})()})
+        words = text.split(" ")
+        self.chunks = [
+            type("Chunk", (), {
+                "usage": None,
+                "choices": [type("Choice", (), {"delta": type("Delta", (), {"content": w + " "})()})],
+            })
+            for w in words
         ]
-        self.usage = {"prompt_tokens": pt, "completion_tokens": ct}
+        self.chunks.append(type("Chunk", (), {
+            "usage": {"prompt_tokens": pt, "completion_tokens": ct},
+            "choices": [],
+        }))
+        self.closed = False
+    def __aiter__(self):
+        return self._iter()
+    async def _iter(self):
+        for chunk in self.chunks:
+            yield chunk
+    async def close(self):
+        self.closed = True
+
+def async_returning(response):
+    """Build a coroutine stand-in for AsyncOpenAI's chat.completions.create."""
+    async def create(**kwargs):
+        return response
+    return create
 
 class PatternAdapter:
     """
@@ -68,7 +94,8 @@ def run_all():
     # --- Test 1: llm_confirm YES / NO ---
     print_header("LLM_CONFIRM: YES / NO")
     for reply, expect in [("Yes, please", True), ("No, thanks", False)]:
-        A.client.chat.completions.create = lambda **k: FakeResponse(reply, pt=2, ct=3)
+        A.aclient.chat.completions.create = async_returning(FakeStream(reply, pt=2, ct=3))
+        A.clear_confirm_memo()
         sess = CallSession("+111")
         res = llm_confirm("Confirm booking", sess)
         print(f"Reply='{reply}' -> {res}")
@@ -76,7 +103,8 @@ def run_all():
 
     # --- Test 2: llm_confirm UNCLEAR ---
     print_header("LLM_CONFIRM: UNCLEAR")
-    A.client.chat.completions.create = lambda **k: FakeResponse("Maybe", pt=1, ct=1)
+    A.aclient.chat.completions.create = async_returning(FakeStream("Maybe", pt=1, ct=1))
+    A.clear_confirm_memo()
     res = llm_confirm("Confirm booking", CallSession("+222"))
     print(f"Reply='Maybe' -> {res}")
     assert_true(res is None, "Expected None for unclear reply")
@@ -85,6 +113,7 @@ def run_all():
     print_header("LLM_CONFIRM: USAGE LIMIT")
     UG.can_call_model = lambda: False
     A.can_call_model  = lambda: False
+    A.clear_confirm_memo()
     try:
         llm_confirm("Confirm booking", CallSession("+333"))
         raise AssertionError("Expected UsageLimitError")
@@ -96,17 +125,161 @@ def run_all():
 
     # --- Test 4: llm_confirm API ERROR ---
     print_header("LLM_CONFIRM: API ERROR")
-    def raise_err(**k): raise RuntimeError("API down")
-    A.client.chat.completions.create = raise_err
+    async def raise_err(**k): raise RuntimeError("API down")
+    A.aclient.chat.completions.create = raise_err
+    A.clear_confirm_memo()
     try:
         llm_confirm("Confirm booking", CallSession("+444"))
         raise AssertionError("Expected RuntimeError")
     except RuntimeError as e:
         print("Caught RuntimeError as expected:", e)
 
+    # --- Test 4b: llm_confirm MEMO HIT ---
+    print_header("LLM_CONFIRM: MEMO HIT")
+    A.aclient.chat.completions.create = async_returning(FakeStream("YES", pt=1, ct=1))
+    A.clear_confirm_memo()
+    first = llm_confirm("Confirm  booking for Oil Change", CallSession("+445"))
+    A.aclient.chat.completions.create = raise_err
+    second = llm_confirm("confirm booking for oil change ", CallSession("+446"))
+    print(f"First={first} Second={second}")
+    assert_true(first is True and second is True, "Expected the repeated question to be served from the memo")
+
+    # --- Test 4c: llm_confirm TIMEOUT ---
+    print_header("LLM_CONFIRM: TIMEOUT")
+    async def stall(**k):
+        await asyncio.sleep(5)
+    A.aclient.chat.completions.create = stall
+    A.clear_confirm_memo()
+    original_timeout, A.CONFIRM_TIMEOUT = A.CONFIRM_TIMEOUT, 0.2
+    try:
+        llm_confirm("Confirm booking at noon", CallSession("+447"))
+        raise AssertionError("Expected TimeoutError")
+    except TimeoutError:
+        print("Caught TimeoutError as expected")
+    finally:
+        A.CONFIRM_TIMEOUT = original_timeout
+
+    # --- Test 4d: tokens of a timed-out confirmation are still recorded ---
+    print_header("LLM_CONFIRM: TIMEOUT USAGE")
+    async def slow(**k):
+        await asyncio.sleep(0.3)
+        return FakeStream("Yes", pt=3, ct=4)
+    A.aclient.chat.completions.create = slow
+    A.clear_confirm_memo()
+    recorded = []
+    original_record, original_persist = A.record_usage, A.persist_usage
+    A.record_usage = lambda n: recorded.append(("guard", n))
+    A.persist_usage = lambda call_id, n: recorded.append((call_id, n))
+    A.CONFIRM_TIMEOUT = 0.1
+
+    async def time_out_then_wait():
+        try:
+            await A.llm_confirm_async("Confirm booking at one", CallSession("+448"))
+        except TimeoutError:
+            print("Caught TimeoutError as expected")
+        await asyncio.sleep(0.5)  # the abandoned call completes meanwhile
+
+    try:
+        asyncio.run(time_out_then_wait())
+    finally:
+        A.CONFIRM_TIMEOUT = original_timeout
+        A.record_usage, A.persist_usage = original_record, original_persist
+    print("Recorded usage:", recorded)
+    # the stream closes after the first word, so the count is the estimate
+    assert_true([who for who, _ in recorded] == ["guard", "+448"] and recorded[0][1] == recorded[1][1] > 0,
+                "Timed-out call's tokens were not recorded")
+
+    # --- Test 4e: llm_confirm_many label parsing ---
+    print_header("LLM_CONFIRM_MANY: LABEL PARSING")
+    cases = [
+        ('["YES", "no", "Unclear"]', 3, [True, False, None]),
+        ('Sure: ["YES"]', 3, [True, None, None]),
+        ('["NO", "YES", "YES", "NO"]', 2, [False, True]),
+        ("1. YES\n2) no\n3 - unclear", 3, [True, False, None]),
+        ("2. NO\n9. YES", 3, [None, False, None]),
+        ("I cannot help with that [sorry", 2, [None, None]),
+    ]
+    for text, n, expect in cases:
+        got = A._parse_labels(text, n)
+        print(f"{text!r} (n={n}) -> {got}")
+        assert_true(got == expect, f"Bad labels for {text!r}")
+
+    def completion(content, pt=5, ct=6):
+        message = type("Message", (), {"content": content})()
+        return type("Completion", (), {
+            "choices": [type("Choice", (), {"message": message})()],
+            "usage": {"prompt_tokens": pt, "completion_tokens": ct},
+        })()
+    seen_groups = []
+    async def classify(**k):
+        lines = k["messages"][1]["content"].splitlines()
+        seen_groups.append(len(lines))
+        return completion(json.dumps(["YES" if "yes" in l else "NO" for l in lines]))
+    A.aclient.chat.completions.create = classify
+    paraphrases = [f"caller said {'yes' if i % 3 else 'no'} #{i}" for i in range(12)]
+    verdicts = A.llm_confirm_many(paraphrases, CallSession("+449"))
+    print("Groups sent:", seen_groups, "verdicts:", verdicts)
+    assert_true(seen_groups == [A.CONFIRM_MANY_BATCH, 12 - A.CONFIRM_MANY_BATCH], "Expected one call per group")
+    assert_true(verdicts == [bool(i % 3) for i in range(12)], "Verdicts out of order")
+
+    # --- Test 4f: llm_confirm_batch through a stubbed Batch API client ---
+    print_header("LLM_CONFIRM_BATCH: BATCH API")
+    class FakeBatchClient:
+        def __init__(self, statuses, output_lines=()):
+            self.statuses = list(statuses)
+            self.output = "\n".join(output_lines) + "\n"
+            self.uploaded = None
+            ns = SimpleNamespace
+            self.files = ns(create=self._upload, content=lambda file_id: ns(text=self.output))
+            self.batches = ns(create=lambda **kw: ns(id="batch_1"), retrieve=self._retrieve)
+        def _upload(self, file, purpose):
+            self.uploaded = file[1].decode("utf-8")
+            return type("Upload", (), {"id": "file_in"})()
+        def _retrieve(self, batch_id):
+            status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+            return type("Batch", (), {"status": status, "output_file_id": "file_out"})()
+
+    def output_row(custom_id, text=None, error=None):
+        row = {"custom_id": custom_id, "error": error, "response": None}
+        if text is not None:
+            row["response"] = {"body": {
+                "choices": [{"message": {"content": text}}],
+                "usage": {"prompt_tokens": 2, "completion_tokens": 1},
+            }}
+        return json.dumps(row)
+
+    sessions = [CallSession(f"+46{i}") for i in range(3)]
+    fake = FakeBatchClient(
+        ["validating", "in_progress", "completed"],
+        # out of order, and the middle request failed inside the batch
+        [output_row("+462:2", "NO"), output_row("+461:1", error={"code": "server_error"}),
+         output_row("+460:0", "YES")],
+    )
+    original_get_client = A._get_client
+    A._get_client = lambda: fake
+    try:
+        verdicts = A.llm_confirm_batch(["Book A?", "Book B?", "Book C?"], sessions, poll_interval=0)
+        sent = [json.loads(line) for line in fake.uploaded.splitlines()]
+        print("JSONL ids:", [r["custom_id"] for r in sent],
+              "max_tokens:", {r["body"]["max_tokens"] for r in sent})
+        print("Batch verdicts:", verdicts)
+        assert_true([r["custom_id"] for r in sent] == ["+460:0", "+461:1", "+462:2"], "Bad JSONL custom_ids")
+        assert_true(all(r["body"]["messages"] == A.build_confirm_prompt(p)
+                        for r, p in zip(sent, ["Book A?", "Book B?", "Book C?"])), "Bad JSONL bodies")
+        assert_true(verdicts == [True, None, False], "Results not demuxed by custom_id")
+
+        A._get_client = lambda: FakeBatchClient(["in_progress"])
+        try:
+            A.llm_confirm_batch(["Book D?"], [CallSession("+463")], poll_interval=0, timeout=0)
+            raise AssertionError("Expected TimeoutError")
+        except TimeoutError as e:
+            print("Caught TimeoutError as expected:", e)
+    finally:
+        A._get_client = original_get_client
+
     # --- Test 5: PROCESS_INTERACTION: YES -> BOOKING (pre-seed + skip extractor) ---
     print_header("PROCESS_INTERACTION: YES -> BOOKING")
-    A.client.chat.completions.create = lambda **k: FakeResponse("Yes", pt=1, ct=2)
+    A.aclient.chat.completions.create = async_returning(FakeStream("Yes", pt=1, ct=2))
     UG.can_call_model = lambda: True
     A.can_call_model  = lambda: True
 
@@ -132,7 +305,7 @@ def run_all():
 
     # --- Test 6: PROCESS_INTERACTION: NO -> RETRY ---
     print_header("PROCESS_INTERACTION: NO -> RETRY")
-    A.client.chat.completions.create = lambda **k: FakeResponse("No", pt=1, ct=1)
+    A.aclient.chat.completions.create = async_returning(FakeStream("No", pt=1, ct=1))
 
     A.extract_and_prepare = lambda *args, **kwargs: None
     session = CallSession("+666")
@@ -151,7 +324,7 @@ def run_all():
 
     # --- Test 7: PROCESS_INTERACTION: UNCLEAR -> ESCALATION ---
     print_header("PROCESS_INTERACTION: UNCLEAR -> ESCALATION")
-    A.client.chat.completions.create = lambda **k: FakeResponse("Hmm", pt=1, ct=1)
+    A.aclient.chat.completions.create = async_returning(FakeStream("Hmm", pt=1, ct=1))
 
     A.extract_and_prepare = lambda *args, **kwargs: None
     session = CallSession("+777")
@@ -168,6 +341,41 @@ def run_all():
     assert_true(escalation_message() in resp,
                 "Expected escalation when LLM unclear")
 
+    # --- Test 8: PROCESS_INTERACTION: 2-TOKEN CONFIRMATION BUDGET ---
+    print_header("PROCESS_INTERACTION: 2-TOKEN CONFIRMATION")
+    seen = {}
+    async def create_two_tokens(**k):
+        seen.update(k)
+        return FakeStream("YES", pt=1, ct=1)
+    A.aclient.chat.completions.create = create_two_tokens
+
+    # Fresh reply cache and calendar so the LLM path runs on every test run
+    tmp = Path(tempfile.mkdtemp(prefix="llm_test_"))
+    A.confirm_cache = ConfirmationCache(
+        A.AFFIRMATIVE_KEYWORDS, A.NEGATIVE_KEYWORDS, path=tmp / "confirm_cache.json"
+    )
+    original_ics = A._ICS_PATH
+    A._ICS_PATH = tmp / "appointments.ics"
+
+    A.extract_and_prepare = lambda *args, **kwargs: None
+    session = CallSession("+888")
+    session.update_slot("service", "Oil Change")
+    session.update_slot("date",    "2025-08-28")
+    session.update_slot("time",    "10:00")
+
+    adapter = PatternAdapter([
+        (r"^>", lambda: "hmm"),
+    ])
+    resp = process_interaction("Book appointment", session, adapter)
+    A._ICS_PATH = original_ics
+    print("max_tokens:", seen.get("max_tokens"))
+    print("process_interaction resp:", resp)
+    assert_true(seen.get("max_tokens") == 2, "Expected a 2-token confirmation budget")
+    assert_true(seen["messages"][0]["content"] == A.CONFIRM_SYSTEM_PROMPT,
+                "Expected the one-line confirmation system prompt")
+    assert_true("Appointment confirmed" in resp,
+                "Expected booking when LLM says YES")
+
     print("\n---ALL LLM TESTS PASSED---\n")
 
 if __name__ == "__main__":
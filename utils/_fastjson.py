@@ -0,0 +1,30 @@
+# utils/_fastjson.py
+
+import json
+
+# orjson is optional: a C serializer, several times faster than stdlib json
+# on session-sized dicts. Output parses the same either way; only whitespace
+# in compact mode differs.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumpb(obj, default=None, indent: bool = False) -> bytes:
+    """
+    UTF-8 JSON bytes for obj (non-ASCII kept as-is); indent=True uses 2 spaces.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=default, option=option)
+    return dumps(obj, default=default, indent=indent).encode("utf-8")
+
+
+def dumps(obj, default=None, indent: bool = False) -> str:
+    """
+    Same as dumpb() but returns str.
+    """
+    if orjson is not None:
+        return dumpb(obj, default=default, indent=indent).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, default=default, indent=2 if indent else None)
@@ -1,18 +1,32 @@
 # utils/call_logger.py
 
+import atexit
 import os
 import json
+import queue
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
+from utils._fastjson import dumps
 
 LOG_DIR = Path("data/logs")
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
+# Serialized events waiting for the background writer (threading.Event = flush marker)
+_EVENT_QUEUE: "queue.SimpleQueue[str | threading.Event]" = queue.SimpleQueue()
+_BATCH_SIZE = 64
+_BATCH_INTERVAL = 0.1  # seconds a partial batch may wait for more events
+_writer: threading.Thread | None = None
+_writer_lock = threading.Lock()
+
 def log_call_start(phone_number):
     """
     Start a new call log with timestamp and phone number.
     Returns a unique call ID and the start time.
     """
+    # queued events belong to the previous call's file
+    flush()
     call_id = f"{phone_number.replace('+', '').replace('-', '')}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
     log_file = LOG_DIR / f"{call_id}.json"
 
@@ -32,6 +46,7 @@ def log_call_end(call_id):
     """
     Ends the call by appending an end timestamp to the log file.
     """
+    flush()
     log_file = LOG_DIR / f"{call_id}.json"
     if not log_file.exists():
         print(f"Warning: Log file not found for call_id {call_id}")
@@ -44,10 +59,10 @@ def log_call_end(call_id):
         json.dump(data, f, indent=4)
         f.truncate()
 
-def log_interaction(event_type, payload):
+def _write_events(events: list[str]):
     """
-    Appends an event to the most recent call log.
-    Used for assistant responses, user messages, and errors.
+    Append a batch of serialized events to the most recent call log with a
+    single read/rewrite of the file.
     """
     current_log_files = sorted(LOG_DIR.glob("*.json"), reverse=True)
     if not current_log_files:
@@ -59,13 +74,70 @@ def log_interaction(event_type, payload):
     try:
         with open(log_file, "r+") as f:
             data = json.load(f)
-            data.setdefault("events", []).append({
-                "timestamp": datetime.now().isoformat(),
-                "event": event_type,
-                "payload": payload
-            })
+            data.setdefault("events", []).extend(json.loads(e) for e in events)
             f.seek(0)
             json.dump(data, f, indent=4)
             f.truncate()
     except Exception as e:
         print(f"Failed to log interaction: {e}")
+
+def _writer_loop():
+    """
+    Drain _EVENT_QUEUE forever, writing up to _BATCH_SIZE events per rewrite.
+    A flush marker ends the current batch early and is set once it is on disk.
+    """
+    while True:
+        item = _EVENT_QUEUE.get()
+        batch, waiters = [], []
+        deadline = time.monotonic() + _BATCH_INTERVAL
+        while True:
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+                break
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= _BATCH_SIZE or remaining <= 0:
+                break
+            try:
+                item = _EVENT_QUEUE.get(timeout=remaining)
+            except queue.Empty:
+                break
+        if batch:
+            _write_events(batch)
+        for w in waiters:
+            w.set()
+
+def flush(timeout: float = 5.0):
+    """
+    Block until every interaction logged so far has been written.
+    """
+    if _writer is None or not _writer.is_alive():
+        return
+    done = threading.Event()
+    _EVENT_QUEUE.put(done)
+    done.wait(timeout)
+
+atexit.register(flush)
+
+def log_interaction(event_type, payload):
+    """
+    Queue an event for the most recent call log; a background thread
+    appends it. Used for assistant responses, user messages, and errors.
+    The event is serialized here, so later changes to payload are not logged.
+    """
+    global _writer
+    try:
+        line = dumps({
+            "timestamp": datetime.now().isoformat(),
+            "event": event_type,
+            "payload": payload
+        })
+    except Exception as e:
+        print(f"Failed to log interaction: {e}")
+        return
+    if _writer is None or not _writer.is_alive():
+        with _writer_lock:
+            if _writer is None or not _writer.is_alive():
+                _writer = threading.Thread(target=_writer_loop, name="call-log-writer", daemon=True)
+                _writer.start()
+    _EVENT_QUEUE.put_nowait(line)
@@ -1,14 +1,161 @@
 # utils/persistence.py
 
+import itertools
 import json
-from datetime import datetime
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from pathlib import Path
-from core.paths import CALLS_JSON_PATH as CALLS_FILE, USAGE_JSON_PATH as USAGE_FILE
+from typing import Optional
+from core.paths import (
+    CALLS_JSON_PATH as CALLS_FILE,
+    USAGE_EVENTS_PATH as USAGE_FILE,
+    PERSIST_WAL_DIR as WAL_DIR,
+)
 from assistant.session import CallSession
+from utils._fastjson import dumpb
+
+# Merges batches into the JSON stores off the caller's response path
+_PERSIST_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="persist")
+# Serializes read-modify-write of the JSON stores across pool workers and callers
+_STORE_LOCK = threading.Lock()
+_inflight: set = set()
+_inflight_lock = threading.Lock()
+_wal_seq = itertools.count()
+# WAL files are renamed to <stem>.<_CLAIM_TAG>.claimed before merging, so each
+# batch is merged by exactly one process even when workers share DATA_DIR
+_CLAIM_TAG = f"{os.getpid()}-{secrets.token_hex(4)}"
+# A claimed file this old was left by a process that died mid-merge
+_WAL_CLAIM_TIMEOUT = float(os.getenv("PERSIST_WAL_CLAIM_TIMEOUT", "300"))
+_UTC = timezone.utc
+
+# Records queued by an active batched_writes() block, or None outside one
+_pending: ContextVar[Optional[dict]] = ContextVar("_pending_writes", default=None)
+
+@contextmanager
+def batched_writes():
+    """
+    Defer persist_call_session / persist_usage inside the block. On exit (also
+    when the block raises) the queued records go to a WAL file and are merged
+    into the JSON stores by _PERSIST_POOL, so the caller does not wait on the
+    rewrite. Records are serialized when queued, so what lands on disk is the
+    same as with immediate writes. Nested blocks join the outermost one.
+    """
+    if _pending.get() is not None:
+        yield
+        return
+    buf = {"calls": [], "usage": []}
+    token = _pending.set(buf)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+        if buf["calls"] or buf["usage"]:
+            _submit(_write_wal(buf))
+
+def _append(file, entries: list[dict]):
+    path = Path(file)
+    for entry in entries:
+        _format_timestamps(entry)
+    with _STORE_LOCK:
+        records = load_calls() if file == CALLS_FILE else load_usage_events()
+        records.extend(entries)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(dumpb(records, indent=True))
+
+def _write_wal(batch: dict) -> Path:
+    """
+    Synchronously record a batch in its own WAL file (temp file + rename, so a
+    crash never leaves a half-written batch behind).
+    """
+    wal_dir = Path(WAL_DIR)
+    wal_dir.mkdir(parents=True, exist_ok=True)
+    path = wal_dir / f"{time.time_ns():020d}-{next(_wal_seq):06d}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(dumpb(batch))
+    os.replace(tmp, path)
+    return path
+
+def _claim(path: Path) -> Optional[Path]:
+    """
+    Atomically take a WAL file for merging. None if another process (or an
+    earlier claim in this one) got it first.
+    """
+    claimed = path.with_name(f"{path.name.split('.', 1)[0]}.{_CLAIM_TAG}.claimed")
+    try:
+        os.rename(path, claimed)
+    except FileNotFoundError:
+        return None
+    # rename keeps the write time; staleness counts from the claim
+    os.utime(claimed)
+    return claimed
+
+def _apply_wal(path: Path):
+    """
+    Merge one claimed WAL batch into the JSON stores, then drop the file. A
+    crash between the two leaves a stale claim that replay_wal() picks up
+    again (at-least-once).
+    """
+    batch = json.loads(path.read_text(encoding="utf-8"))
+    if batch.get("calls"):
+        _append(CALLS_FILE, batch["calls"])
+    if batch.get("usage"):
+        _append(USAGE_FILE, batch["usage"])
+    path.unlink(missing_ok=True)
+
+def _submit(path: Path):
+    claimed = _claim(path)
+    if claimed is None:
+        return
+    fut = _PERSIST_POOL.submit(_apply_wal, claimed)
+    with _inflight_lock:
+        _inflight.add(fut)
+    # a failed merge leaves its claim behind; replay_wal() retries it once stale
+    fut.add_done_callback(_forget)
+
+def _forget(fut):
+    with _inflight_lock:
+        _inflight.discard(fut)
+
+def replay_wal():
+    """
+    Queue WAL batches nobody is merging, oldest first: unclaimed ones and
+    claims older than PERSIST_WAL_CLAIM_TIMEOUT. Call once at startup; the
+    claim keeps a batch another live worker is about to merge from being
+    merged twice.
+    """
+    wal_dir = Path(WAL_DIR)
+    if not wal_dir.is_dir():
+        return
+    stale_before = time.time() - _WAL_CLAIM_TIMEOUT
+    paths = list(wal_dir.glob("*.json"))
+    for path in wal_dir.glob("*.claimed"):
+        try:
+            if path.stat().st_mtime < stale_before:
+                paths.append(path)
+        except FileNotFoundError:
+            pass
+    # names start with the zero-padded write time
+    for path in sorted(paths, key=lambda p: p.name):
+        _submit(path)
+
+def flush_pending(timeout: Optional[float] = None):
+    """
+    Block until batches handed to the background pool have been merged.
+    """
+    with _inflight_lock:
+        pending = list(_inflight)
+    wait(pending, timeout=timeout)
 
 def load_calls() -> list[dict]:
     """
     Load persisted call/session records from CALLS_FILE.
+    Batches still in the background pool are not included; see flush_pending().
     Returns an empty list if none exist.
     """
     path = Path(CALLS_FILE)
@@ -21,37 +168,53 @@ def _serialize_session(session: CallSession) -> dict:
     """
     Turn a CallSession into a JSON-serializable dict.
     """
-    return {
-        "call_id": session.call_id,
-        "caller_number": session.caller_number,
-        "state": session.state,
-        "history": session.history,
-        "created_at": datetime.utcnow().isoformat()
-    }
+    with session._lock:
+        return {
+            "call_id": session.call_id,
+            "caller_number": session.caller_number,
+            "state": dict(session.state),
+            "history": session.export_history(),
+            "created_at_ns": time.time_ns(),
+        }
 
-def persist_call_session(record):
+def _format_timestamps(entry: dict):
     """
-    Append a call/session record to CALLS_FILE.
-    Accepts either:
-      - a CallSession instance, or
-      - a plain dict.
+    Turn integer <field>_ns stamps taken at queue time into the stored
+    ISO-8601 (UTC) strings; done at merge time, off the caller's path.
     """
-    path = Path(CALLS_FILE)
-    calls = load_calls()
+    for field in ("created_at", "timestamp"):
+        ns = entry.pop(field + "_ns", None)
+        if ns is not None and field not in entry:
+            entry[field] = datetime.fromtimestamp(ns / 1e9, _UTC).isoformat()
 
+def _to_entry(record) -> dict:
     if isinstance(record, CallSession):
-        entry = _serialize_session(record)
-    elif isinstance(record, dict):
+        return _serialize_session(record)
+    if isinstance(record, dict):
         entry = record.copy()
-        entry.setdefault("created_at", datetime.utcnow().isoformat())
-    else:
-        raise TypeError("persist_call_session expects a CallSession or dict")
+        if "created_at" not in entry:
+            entry.setdefault("created_at_ns", time.time_ns())
+        return entry
+    raise TypeError("persist_call_session expects a CallSession or dict")
 
-    calls.append(entry)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(calls, ensure_ascii=False, indent=2), encoding="utf-8")
+def persist_call_session(record):
+    """
+    Append call/session records to CALLS_FILE.
+    Accepts either:
+      - a CallSession instance,
+      - a plain dict, or
+      - a list of those, appended with a single read/rewrite of the file.
+    Inside batched_writes() the entries are queued instead.
+    """
+    records = record if isinstance(record, list) else [record]
+    entries = [_to_entry(r) for r in records]
+    buf = _pending.get()
+    if buf is not None:
+        buf["calls"].extend(entries)
+        return
+    _append(CALLS_FILE, entries)
 
-def persist_appointment(appointment_data: dict):
+def persist_appointment(appointment_data: dict | list[dict]):
     """
     Alias for appointments if you treat them separately.
     Just reuses call-session persistence by default.
@@ -69,16 +232,17 @@ def load_usage_events() -> list[dict]:
         path.write_text("[]", encoding="utf-8")
     return json.loads(path.read_text(encoding="utf-8"))
 
-def persist_usage(call_id: str, tokens_used: int):
+def persist_usage(call_id: str, tokens_used: int | list[int]):
     """
-    Append a usage event (with call_id, token count, timestamp) to USAGE_FILE.
+    Append usage events (with call_id, token count, timestamp) to USAGE_FILE.
+    tokens_used may be a list to record several events in one write.
+    Inside batched_writes() the events are queued instead.
     """
-    path = Path(USAGE_FILE)
-    events = load_usage_events()
-    events.append({
-        "call_id": call_id,
-        "tokens": tokens_used,
-        "timestamp": datetime.utcnow().isoformat()
-    })
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(events, ensure_ascii=False, indent=2), encoding="utf-8")
+    now = time.time_ns()
+    counts = tokens_used if isinstance(tokens_used, list) else [tokens_used]
+    entries = [{"call_id": call_id, "tokens": n, "timestamp_ns": now} for n in counts]
+    buf = _pending.get()
+    if buf is not None:
+        buf["usage"].extend(entries)
+        return
+    _append(USAGE_FILE, entries)
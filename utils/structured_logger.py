@@ -1,12 +1,54 @@
 # utils/structured_logger.py
 
+import atexit
 import json
+import logging
+import os
+import queue
+import sys
 import threading
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 from core.paths import STRUCT_LOG_FILE as LOG_FILE, STRUCT_LOG_ARCHIVE as ARCHIVE_DIR
+from utils._fastjson import dumpb
 
 _lock = threading.Lock()
+_UTC = timezone.utc
+
+# Serialized lines waiting for the background writer (threading.Event = flush marker)
+_LOG_QUEUE: "queue.SimpleQueue[bytes | threading.Event]" = queue.SimpleQueue()
+_BATCH_SIZE = 256
+_BATCH_INTERVAL = 0.1  # seconds a partial batch may wait for more lines
+_writer: threading.Thread | None = None
+
+# Level gate for log_event; tune with STRUCT_LOG_LEVEL or
+# logging.getLogger("structured_calls").setLevel(...)
+_logger = logging.getLogger("structured_calls")
+try:
+    _logger.setLevel(os.getenv("STRUCT_LOG_LEVEL", "INFO").upper())
+except ValueError:
+    _logger.setLevel(logging.INFO)
+
+class Lazy:
+    """
+    Deferred log payload: fn() runs only if the event passes the level gate.
+    """
+    __slots__ = ("fn",)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __str__(self):
+        return str(self.fn())
+
+    __repr__ = __str__
+
+def _resolve(obj):
+    # dumpb() hook: unwrap Lazy payloads at serialization time
+    if isinstance(obj, Lazy):
+        return obj.fn()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 def _rotate_if_needed():
     """
@@ -18,26 +60,92 @@ def _rotate_if_needed():
     archive_dir.mkdir(parents=True, exist_ok=True)
 
     if log_path.exists() and log_path.stat().st_size > 5 * 1024 * 1024:
-        ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        ts = datetime.now(_UTC).strftime("%Y%m%dT%H%M%SZ")
         archived = archive_dir / f"structured_calls_{ts}.ndjson"
         log_path.rename(archived)
         log_path.write_text("", encoding="utf-8")
 
+def _write_batch(lines: list[bytes]):
+    log_path = Path(LOG_FILE)
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        _rotate_if_needed()
+        with open(log_path, "ab") as f:
+            f.write(b"".join(lines))
+
+def _writer_loop():
+    """
+    Drain _LOG_QUEUE forever, appending up to _BATCH_SIZE lines per write.
+    A flush marker ends the current batch early and is set once it is on disk.
+    """
+    while True:
+        item = _LOG_QUEUE.get()
+        batch, waiters = [], []
+        deadline = time.monotonic() + _BATCH_INTERVAL
+        while True:
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+                break
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= _BATCH_SIZE or remaining <= 0:
+                break
+            try:
+                item = _LOG_QUEUE.get(timeout=remaining)
+            except queue.Empty:
+                break
+        if batch:
+            try:
+                _write_batch(batch)
+            except Exception as e:
+                # nobody to raise to from here; keep the writer alive
+                print(f"structured_logger: failed to write {len(batch)} events: {e}", file=sys.stderr)
+        for w in waiters:
+            w.set()
+
+def _init_logger():
+    global _writer
+    with _lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_writer_loop, name="structured-log-writer", daemon=True)
+            _writer.start()
+
+def flush(timeout: float = 5.0, wait: bool = True):
+    """
+    Block until every event logged so far has been written to LOG_FILE.
+    With wait=False, only ask the writer to write them now (ending its
+    current batch early) and return at once; safe on the event loop.
+    """
+    if _writer is None or not _writer.is_alive():
+        if _LOG_QUEUE.empty():
+            return
+        # writer died (or this is a forked child): restart it to drain the queue
+        _init_logger()
+    done = threading.Event()
+    _LOG_QUEUE.put(done)
+    if wait:
+        done.wait(timeout)
+
+atexit.register(flush)
+
 def log_event(
     call_id: str,
     step: str,
     input_data=None,
     output_data=None,
     outcome: str = "ok",
-    extra: dict | None = None
+    extra: dict | Lazy | None = None,
+    level: int = logging.INFO
 ):
     """
-    Append a single NDJSON line to LOG_FILE.
+    Queue a single NDJSON line for LOG_FILE; a background thread appends it.
+    Events below the "structured_calls" logger level are dropped before any
+    work; payloads may be Lazy to defer building them until then.
+    The entry is serialized here, so later changes to the payload are not logged.
     Auto-creates parent directories and rotates if too large.
     """
-    log_path = Path(LOG_FILE)
-    log_path.parent.mkdir(parents=True, exist_ok=True)
-
+    if not _logger.isEnabledFor(level):
+        return
     entry = {
         "call_id": call_id,
         "step": step,
@@ -45,19 +153,19 @@ def log_event(
         "output": output_data,
         "outcome": outcome,
         "extra": extra or {},
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.now(_UTC).isoformat(),
     }
-    line = json.dumps(entry, ensure_ascii=False)
+    line = dumpb(entry, default=_resolve)
 
-    with _lock:
-        _rotate_if_needed()
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write(line + "\n")
+    if _writer is None or not _writer.is_alive():
+        _init_logger()
+    _LOG_QUEUE.put_nowait(line + b"\n")
 
 def read_events() -> list[dict]:
     """
     Read all JSON lines from LOG_FILE and return them as a list of dicts.
     """
+    flush()
     log_path = Path(LOG_FILE)
     if not log_path.exists():
         return []
@@ -1,8 +1,13 @@
 # utils/usage_guard.py
 
 import json
+import threading
 from pathlib import Path
 from core.paths import USAGE_JSON_PATH as USAGE_FILE
+from utils._fastjson import dumpb
+
+# Serializes the read-modify-write in record_usage across concurrent sessions
+_lock = threading.Lock()
 
 def load_usage() -> dict:
     """
@@ -21,7 +26,7 @@ def save_usage(data: dict):
     """
     path = Path(USAGE_FILE)
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    path.write_bytes(dumpb(data, indent=True))
 
 def can_call_model() -> bool:
     """
@@ -36,6 +41,7 @@ def record_usage(tokens_used: int):
     """
     Increment the total usage counter by tokens_used.
     """
-    data = load_usage()
-    data["tokens"] = data.get("tokens", 0) + tokens_used
-    save_usage(data)
+    with _lock:
+        data = load_usage()
+        data["tokens"] = data.get("tokens", 0) + tokens_used
+        save_usage(data)